@@ -1,7 +1,7 @@
 # admin.py
 from django.contrib import admin
 from unfold.admin import ModelAdmin
-from .models import Event, EventFile, Settore
+from .models import Event, EventFile, ReportJob, Settore, StorageTombstone, StoredBlob
 
 
 @admin.register(Event)
@@ -44,6 +44,29 @@ class SettoreAdmin(ModelAdmin):
 
 @admin.register(EventFile)
 class EventFileAdmin(ModelAdmin):
-    list_display = ('title',)
+    list_display = ('title', 'extension', 'size', 'content_type', 'created_at')
+    list_filter = ('extension',)
     search_fields = ('title',)
     ordering = ('title',)
+    readonly_fields = ('size', 'content_type', 'extension', 'etag', 'checksum', 'blob')
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(ModelAdmin):
+    list_display = ("created_at", "export_format", "status", "progress", "created_by")
+    list_filter = ("status", "export_format")
+    readonly_fields = ("key", "event_ids", "file_key", "error")
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(ModelAdmin):
+    list_display = ("sha256", "name", "size", "ref_count", "created_at")
+    search_fields = ("sha256", "name")
+    readonly_fields = ("sha256", "name", "size", "ref_count")
+
+
+@admin.register(StorageTombstone)
+class StorageTombstoneAdmin(ModelAdmin):
+    list_display = ("key", "attempts", "last_error", "created_at")
+    search_fields = ("key",)
+    readonly_fields = ("key", "attempts", "last_error")
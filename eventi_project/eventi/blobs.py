@@ -0,0 +1,63 @@
+# eventi/blobs.py
+"""
+Content-addressed storage of event files.
+
+Every stored object is a StoredBlob keyed by the SHA-256 of its bytes. An
+upload whose hash is already known reuses the blob instead of storing the
+bytes again; each EventFile holds one reference and the object is deleted
+with the last one (see storage_gc).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import StoredBlob
+from .storage_gc import enqueue_deletion
+
+
+def find_blob(sha256):
+    return StoredBlob.objects.filter(sha256=sha256).first()
+
+
+def acquire_blob(sha256=None, pk=None):
+    """
+    Take a reference on an existing blob, by hash or id.
+    Returns the blob, or None if there is no such blob.
+    """
+    blobs = StoredBlob.objects.filter(
+        **({"sha256": sha256} if sha256 else {"pk": pk})
+    )
+    with transaction.atomic():
+        if not blobs.update(ref_count=F("ref_count") + 1):
+            return None
+        return blobs.get()
+
+
+def register_blob(sha256, name, size, etag=""):
+    """
+    Record a freshly stored object as a blob with one reference.
+    Returns (blob, created): if the same content was registered
+    concurrently, the existing blob is referenced instead and the caller
+    must delete its own copy.
+    """
+    try:
+        with transaction.atomic():
+            return StoredBlob.objects.create(
+                sha256=sha256, name=name, size=size, etag=etag, ref_count=1
+            ), True
+    except IntegrityError:
+        blob = acquire_blob(sha256)
+        if blob is None:
+            # Released in the meantime: retry as the first owner
+            return register_blob(sha256, name, size, etag)
+        return blob, False
+
+
+def release_blob(blob_id):
+    """Drop a reference; the last one deletes the blob and queues its object"""
+    StoredBlob.objects.filter(pk=blob_id).update(ref_count=F("ref_count") - 1)
+    blob = StoredBlob.objects.filter(pk=blob_id, ref_count__lte=0).first()
+    if blob is None:
+        return
+    # Conditional delete: a concurrent upload may have taken a new reference
+    if StoredBlob.objects.filter(pk=blob.pk, ref_count__lte=0).delete()[0]:
+        enqueue_deletion(blob.name)
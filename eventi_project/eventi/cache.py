@@ -0,0 +1,79 @@
+# eventi/cache.py
+"""
+Two-level cache for small, hot lookups such as the choice lists.
+
+Values live in the shared cache (CACHES["default"]) under versioned keys:
+writing a model bumps the version of its namespace, so every worker
+stops using the old values at once, without deleting keys. In front of the
+shared cache each process keeps an L1 copy of the values, and remembers the
+namespace versions for CACHE_L1_TIMEOUT seconds, so the hot path
+costs neither queries nor network round trips.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# namespace -> (version, expires at)
+_versions = {}
+# (namespace, name) -> (version, value)
+_values = {}
+
+
+def _version_key(namespace):
+    return f"eventi:version:{namespace}"
+
+
+def _new_version():
+    # Time based, so a version evicted from the shared cache is never reused
+    return int(time.time() * 1000)
+
+
+def get_version(namespace):
+    """Current version of a namespace, re-read from the shared cache at most
+    every CACHE_L1_TIMEOUT seconds"""
+    now = time.monotonic()
+    entry = _versions.get(namespace)
+    if entry and entry[1] > now:
+        return entry[0]
+
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    _versions[namespace] = (version, now + settings.CACHE_L1_TIMEOUT)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidate every value of a namespace, in all the workers"""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+    # This process sees the new version immediately
+    _versions.pop(namespace, None)
+
+
+def get_or_compute(namespace, name, compute, timeout=3600):
+    """Return the cached value `name` of `namespace`, calling `compute` on a miss"""
+    version = get_version(namespace)
+    entry = _values.get((namespace, name))
+    if entry and entry[0] == version:
+        return entry[1]
+
+    key = f"eventi:{namespace}:{name}:{version}"
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    _values[(namespace, name)] = (version, value)
+    return value
+
+
+def clear_local_cache():
+    """Drop the in-process copies, e.g. between tests"""
+    _versions.clear()
+    _values.clear()
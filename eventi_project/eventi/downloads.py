@@ -0,0 +1,164 @@
+# eventi/downloads.py
+"""
+Helpers to serve stored files: presigned redirects and ranged streaming.
+"""
+import mimetypes
+import re
+
+from botocore.exceptions import ClientError
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.http import content_disposition_header, http_date
+from storages.backends.s3boto3 import S3Boto3Storage
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range "bytes=start-end" header into an inclusive
+    (start, end) pair. Returns None when there is no usable range (the
+    whole file is sent) and raises ValueError when it can't be satisfied.
+    """
+    match = RANGE_RE.match((header or "").strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # "bytes=-500": the last 500 bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def presigned_url(storage, name, filename, expire):
+    """
+    Short-lived URL that downloads the file straight from the bucket as an
+    attachment named `filename`, or None if the storage can't presign.
+    """
+    if not isinstance(storage, S3Boto3Storage) or not storage.querystring_auth:
+        return None
+    return storage.url(
+        name,
+        parameters={
+            "ResponseContentDisposition": content_disposition_header(True, filename)
+        },
+        expire=expire,
+    )
+
+
+def iter_file(fileobj, length, chunk_size=CHUNK_SIZE):
+    """Yield `length` bytes of an open file in chunks, then close it"""
+    try:
+        while length > 0:
+            chunk = fileobj.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def ranged_file_response(request, fileobj, size, filename, content_type=None):
+    """
+    Stream an open, seekable file as an attachment, answering a Range
+    request with 206 Partial Content and only the bytes asked for.
+    """
+    if content_type is None:
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    try:
+        byte_range = parse_range(request.headers.get("Range"), size)
+    except ValueError:
+        fileobj.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(
+            fileobj, as_attachment=True, filename=filename, content_type=content_type
+        )
+        response["Content-Length"] = size
+    else:
+        start, end = byte_range
+        fileobj.seek(start)
+        response = StreamingHttpResponse(
+            iter_file(fileobj, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+        response["Content-Disposition"] = content_disposition_header(True, filename)
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def iter_body(body, chunk_size=CHUNK_SIZE):
+    """Yield a boto3 StreamingBody in chunks, then release its connection"""
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
+
+
+def s3_object_response(request, client, bucket, key, filename, content_type=None):
+    """
+    Stream an S3 object as an attachment without buffering it.
+    Range and If-None-Match are forwarded to the bucket, which answers
+    them itself; Content-Length, ETag and Last-Modified are passed back.
+    Raises ClientError for other failures, e.g. a missing key.
+    """
+    if content_type is None:
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    params = {"Bucket": bucket, "Key": key}
+    if RANGE_RE.match(request.headers.get("Range", "").strip()):
+        params["Range"] = request.headers["Range"].strip()
+    if request.headers.get("If-None-Match"):
+        params["IfNoneMatch"] = request.headers["If-None-Match"]
+
+    try:
+        obj = client.get_object(**params)
+    except ClientError as e:
+        metadata = e.response.get("ResponseMetadata", {})
+        status = metadata.get("HTTPStatusCode")
+        if status == 304:
+            response = HttpResponseNotModified()
+            response["ETag"] = request.headers["If-None-Match"]
+            return response
+        if status == 416:
+            return HttpResponse(status=416)
+        raise
+
+    response = StreamingHttpResponse(
+        iter_body(obj["Body"]),
+        status=206 if "ContentRange" in obj else 200,
+        content_type=content_type,
+    )
+    response["Content-Length"] = obj["ContentLength"]
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    response["Accept-Ranges"] = "bytes"
+    if "ContentRange" in obj:
+        response["Content-Range"] = obj["ContentRange"]
+    if "ETag" in obj:
+        response["ETag"] = obj["ETag"]
+    if "LastModified" in obj:
+        response["Last-Modified"] = http_date(obj["LastModified"].timestamp())
+    return response
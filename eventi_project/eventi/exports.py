@@ -0,0 +1,88 @@
+# eventi/exports.py
+"""
+Bulk export of events as CSV or gzip-compressed JSON Lines.
+
+Rows are read with .iterator(), a server-side cursor on PostgreSQL, and
+encoded as they arrive, so an export of the whole archive uses constant
+memory and its first bytes go out right away.
+"""
+import csv
+import io
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# (column, field read by the query)
+EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("categoria", "categoria"),
+    ("office", "office"),
+    ("titolo", "titolo"),
+    ("data_inizio", "data_inizio"),
+    ("data_fine", "data_fine"),
+    ("paese", "paese"),
+    ("citta", "citta"),
+    ("settore", "settore__nome"),
+    ("tipologia", "tipologia"),
+    ("descrizione", "descrizione"),
+    ("public", "public"),
+    ("created_by", "created_by__username"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+]
+# Rows fetched per round trip
+EXPORT_CHUNK_SIZE = 2000
+# Bytes of output gathered before a piece is emitted
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/gzip", "jsonl.gz"),
+}
+
+
+def export_rows(events, chunk_size=EXPORT_CHUNK_SIZE):
+    """The export columns of an Event queryset, one tuple per event"""
+    rows = events.values_list(*[field for _, field in EXPORT_COLUMNS])
+    return rows.iterator(chunk_size=chunk_size)
+
+
+def iter_csv(events, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the CSV export of an Event queryset as UTF-8 bytes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    for row in export_rows(events, chunk_size):
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_BUFFER_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def iter_jsonl_gzip(events, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the gzip-compressed JSON Lines export of an Event queryset"""
+    # wbits=31: a gzip stream, readable by gunzip and gzip.open()
+    compressor = zlib.compressobj(wbits=31)
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    lines = []
+    size = 0
+    for row in export_rows(events, chunk_size):
+        line = json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= EXPORT_BUFFER_SIZE:
+            data = compressor.compress("".join(lines).encode())
+            if data:
+                yield data
+            lines = []
+            size = 0
+    yield compressor.compress("".join(lines).encode()) + compressor.flush()
+
+
+def iter_export(events, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    if export_format == "csv":
+        return iter_csv(events, chunk_size)
+    return iter_jsonl_gzip(events, chunk_size)
@@ -0,0 +1,95 @@
+# eventi/filters.py
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Event
+from .search import search_events
+
+
+def filter_events(params):
+    """
+    Events filtered and ordered by the query parameters of the event list
+    (q, categoria, office, paese, settore, sort, direction). `params` is a
+    QueryDict or a plain dict. The ordering always ends with the id, so
+    keyset pagination and exports are deterministic.
+    """
+    queryset = Event.objects.all()
+
+    # Handle search and filters
+    q = params.get("q")
+    categoria = params.get("categoria")
+    office = params.get("office")
+    paese = params.get("paese")
+    settore = params.get("settore")
+
+    # Build query conditions incrementally instead of chaining filters
+    conditions = Q()
+    if categoria:
+        conditions &= Q(categoria=categoria)
+    if office:
+        conditions &= Q(office=office)
+    if paese:
+        conditions &= Q(paese=paese)
+    if settore:
+        conditions &= Q(settore_id=settore)
+
+    # Apply all filters at once
+    if conditions:
+        queryset = queryset.filter(conditions)
+
+    # Full-text search over title, description, city and type
+    if q:
+        queryset = search_events(queryset, q)
+
+    # Without an explicit sort, search results are ordered by relevance
+    if q and "sort" not in params:
+        return queryset.order_by("-search_rank", "-id")
+
+    # Handle sorting
+    sort_field = params.get("sort", "data_inizio")
+    sort_direction = params.get("direction", "desc")
+
+    # Validate sort field to prevent SQL injection
+    allowed_fields = [
+        "titolo",
+        "data_inizio",
+        "citta",
+        "settore",
+        "tipologia",
+        "office",
+    ]
+    if sort_field not in allowed_fields:
+        sort_field = "data_inizio"
+
+    # Special handling for settore field (now a foreign key)
+    if sort_field == "settore":
+        # Coalesce so events without a settore still have a comparable key
+        queryset = queryset.annotate(
+            settore_nome=Coalesce("settore__nome", Value(""))
+        )
+        if sort_direction == "asc":
+            queryset = queryset.order_by("settore_nome", "id")
+        else:
+            queryset = queryset.order_by("-settore_nome", "-id")
+    # Special handling for office field (Belgrado first)
+    elif sort_field == "office":
+        # Use Case/When but with a single annotation
+        queryset = queryset.annotate(
+            office_order=Case(
+                When(office="Belgrado", then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        if sort_direction == "asc":
+            queryset = queryset.order_by("office_order", "office", "id")
+        else:
+            queryset = queryset.order_by("-office_order", "-office", "-id")
+    else:
+        # Apply sorting direction for other fields, with id as tiebreaker
+        if sort_direction == "asc":
+            queryset = queryset.order_by(sort_field, "id")
+        else:
+            queryset = queryset.order_by(f"-{sort_field}", "-id")
+
+    return queryset
@@ -0,0 +1,139 @@
+# eventi/jobs.py
+"""
+Background generation of reports.
+
+A ReportJob row is the queue entry. Depending on REPORT_JOBS_BACKEND it is
+run by an in-process thread pool ("thread"), by a Celery worker ("celery"),
+or left pending for the process_report_jobs management command ("db").
+Finished files are saved under reports/ in the default storage, where
+ReportFileListView lists them.
+"""
+import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from .models import Event, ReportJob
+from .report_cache import cached_report
+from .reports import generate_docx, generate_excel
+from .storage import invalidate_report_files
+
+logger = logging.getLogger(__name__)
+
+REPORT_EXTENSIONS = {"docx": "docx", "excel": "xlsx"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Thread pool shared by the whole process, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.REPORT_JOBS_WORKERS,
+                thread_name_prefix="report-job",
+            )
+    return _executor
+
+
+def submit_report_job(event_ids, export_format, user):
+    """
+    Queue a report and return (job, created). If the user already has an
+    identical report pending or running, that job is returned instead.
+    """
+    event_ids = sorted({int(pk) for pk in event_ids})
+    key = ReportJob.make_key(event_ids, export_format, user.pk)
+
+    # A job whose worker died must not block new requests forever
+    stale_before = timezone.now() - datetime.timedelta(
+        seconds=settings.REPORT_JOBS_TIMEOUT
+    )
+    ReportJob.objects.filter(
+        key=key, status__in=ReportJob.ACTIVE_STATUSES, updated_at__lt=stale_before
+    ).update(status=ReportJob.STATUS_FAILED, error="Timeout")
+
+    active = ReportJob.objects.filter(key=key, status__in=ReportJob.ACTIVE_STATUSES)
+    job = active.first()
+    if job:
+        return job, False
+
+    try:
+        with transaction.atomic():
+            job = ReportJob.objects.create(
+                key=key,
+                export_format=export_format,
+                event_ids=event_ids,
+                created_by=user,
+            )
+    except IntegrityError:
+        # A concurrent request created the same job first
+        return active.get(), False
+
+    transaction.on_commit(lambda: dispatch_report_job(job.pk))
+    return job, True
+
+
+def dispatch_report_job(job_id):
+    backend = settings.REPORT_JOBS_BACKEND
+    if backend == "celery":
+        from .tasks import generate_report_task
+
+        generate_report_task.delay(str(job_id))
+    elif backend == "thread":
+        get_executor().submit(run_report_job, job_id)
+    # "db": the job stays pending until process_report_jobs picks it up
+
+
+def run_report_job(job_id):
+    """Generate the report of a pending job and save it under reports/"""
+    # Claim the job, so that two workers never run the same one
+    claimed = ReportJob.objects.filter(
+        pk=job_id, status=ReportJob.STATUS_PENDING
+    ).update(status=ReportJob.STATUS_RUNNING, progress=0, updated_at=timezone.now())
+    if not claimed:
+        return
+
+    try:
+        job = ReportJob.objects.get(pk=job_id)
+        total = max(len(job.event_ids), 1)
+
+        def progress(done):
+            ReportJob.objects.filter(pk=job_id).update(
+                progress=min(99, done * 100 // total), updated_at=timezone.now()
+            )
+
+        events = Event.objects.filter(id__in=job.event_ids).order_by("data_inizio")
+        generate = generate_docx if job.export_format == "docx" else generate_excel
+        buffer = cached_report(events, job.export_format, generate, progress=progress)
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = REPORT_EXTENSIONS[job.export_format]
+        with buffer:
+            file_key = default_storage.save(
+                f"reports/report_{timestamp}_{job.key[:8]}.{extension}", File(buffer)
+            )
+        invalidate_report_files()
+
+        ReportJob.objects.filter(pk=job_id).update(
+            status=ReportJob.STATUS_DONE,
+            progress=100,
+            file_key=file_key,
+            updated_at=timezone.now(),
+        )
+    except Exception as e:
+        logger.exception("Report job %s failed", job_id)
+        ReportJob.objects.filter(pk=job_id).update(
+            status=ReportJob.STATUS_FAILED, error=str(e), updated_at=timezone.now()
+        )
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            # Worker threads own their connections, don't leak them
+            connections.close_all()
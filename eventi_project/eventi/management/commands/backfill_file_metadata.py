@@ -0,0 +1,101 @@
+# eventi/management/commands/backfill_file_metadata.py
+import hashlib
+import mimetypes
+import os
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.core.management.base import BaseCommand, CommandError
+
+from eventi.models import EventFile
+from eventi.storage import BackblazeB2Storage
+
+METADATA_FIELDS = ["size", "content_type", "extension", "etag", "checksum"]
+
+
+class Command(BaseCommand):
+    help = "Fill size, content type, extension, ETag and checksum of stored event files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of files updated per query (default 200)",
+        )
+        parser.add_argument(
+            "--checksums",
+            action="store_true",
+            help="Also download the files without a blob to compute their SHA-256",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Refresh every file, not only those without a size",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be a positive number")
+
+        storage = EventFile._meta.get_field("file").storage
+        if not isinstance(storage, BackblazeB2Storage):
+            raise CommandError("Event files are not stored in a B2/S3 bucket")
+        client = storage.connection.meta.client
+
+        files = EventFile.objects.select_related("blob").order_by("pk")
+        if not options["all"]:
+            files = files.filter(size__isnull=True)
+
+        updated = failed = 0
+        batch = []
+        for event_file in files.iterator(chunk_size=batch_size):
+            params = {
+                "Bucket": storage.bucket_name,
+                "Key": storage.object_key(event_file.file.name),
+            }
+            try:
+                head = client.head_object(**params)
+                event_file.size = head["ContentLength"]
+                event_file.etag = head.get("ETag", "")
+                event_file.content_type = (
+                    head.get("ContentType")
+                    or mimetypes.guess_type(event_file.file.name)[0]
+                    or ""
+                )
+                if event_file.blob:
+                    event_file.checksum = event_file.blob.sha256
+                elif options["checksums"]:
+                    event_file.checksum = self.object_checksum(client, params)
+            except (BotoCoreError, ClientError) as e:
+                self.stdout.write(
+                    self.style.ERROR(f"{event_file.file.name}: {e}")
+                )
+                failed += 1
+                continue
+            event_file.extension = (
+                os.path.splitext(event_file.file.name)[1].lower()[1:][:10]
+            )
+
+            batch.append(event_file)
+            if len(batch) >= batch_size:
+                EventFile.objects.bulk_update(batch, METADATA_FIELDS)
+                updated += len(batch)
+                batch = []
+
+        EventFile.objects.bulk_update(batch, METADATA_FIELDS)
+        updated += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Metadata of {updated} files updated, {failed} failed")
+        )
+
+    def object_checksum(self, client, params):
+        checksum = hashlib.sha256()
+        body = client.get_object(**params)["Body"]
+        try:
+            for chunk in body.iter_chunks(1024 * 1024):
+                checksum.update(chunk)
+        finally:
+            body.close()
+        return checksum.hexdigest()
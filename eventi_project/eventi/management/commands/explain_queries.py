@@ -0,0 +1,133 @@
+# eventi/management/commands/explain_queries.py
+import datetime
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from eventi.models import Event, Settore
+from eventi.views import EventListView, ReportSelectionView
+
+User = get_user_model()
+
+# Table scans as reported by EXPLAIN on PostgreSQL and SQLite. On SQLite
+# "SCAN t USING INDEX i" still walks the whole index and reads every row,
+# only a covering index or a full-text lookup is cheap
+SEQ_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (eventi_\w+)"),
+    "sqlite": re.compile(
+        r"\bSCAN (?:TABLE )?(?!CONSTANT ROW)(\w+)\b(?! USING COVERING INDEX| VIRTUAL TABLE)"
+    ),
+}
+
+# Sorts the planner can't take from an index
+SORT_PATTERNS = {
+    "postgresql": re.compile(r"Sort Key: (.+)$", re.MULTILINE),
+    "sqlite": re.compile(r"USE TEMP B-TREE FOR (.+)$", re.MULTILINE),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN over the canonical event list and report queries "
+        "and report the ones that fall back to sequential scans or sorts"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--plans", action="store_true", help="Print the full query plans"
+        )
+        parser.add_argument(
+            "--force-index",
+            action="store_true",
+            help=(
+                "PostgreSQL only: disable seq scans while explaining, so small "
+                "tables don't hide queries that have no usable index"
+            ),
+        )
+
+    def get_queries(self):
+        """Build the querysets exactly as the views do"""
+        factory = RequestFactory()
+        settore_id = Settore.objects.values_list("id", flat=True).first() or 1
+        year = datetime.date.today().year
+        staff = User(pk=0, username="explain", is_staff=True)
+        user = User(pk=0, username="explain", is_staff=False)
+
+        list_cases = {
+            "list: default": {},
+            "list: categoria": {"categoria": Event.CATEGORIA_CHOICES[0][0]},
+            "list: office": {"office": "Belgrado"},
+            "list: paese": {"paese": "Italia"},
+            "list: settore": {"settore": settore_id},
+            "list: search": {"q": "fiera"},
+            "list: sort titolo": {"sort": "titolo", "direction": "asc"},
+        }
+        report_cases = {
+            "report: staff, year": (staff, {"year": year}),
+            "report: staff, paese + year": (staff, {"paese": "Italia", "year": year}),
+            "report: user": (user, {}),
+            "report: user, categoria + year": (
+                user,
+                {"categoria": Event.CATEGORIA_CHOICES[0][0], "year": year},
+            ),
+        }
+
+        for name, params in list_cases.items():
+            view = EventListView()
+            view.setup(factory.get("/", params))
+            yield name, view.get_queryset()
+
+        for name, (report_user, params) in report_cases.items():
+            request = factory.get("/report/", params)
+            request.user = report_user
+            view = ReportSelectionView()
+            view.setup(request)
+            yield name, view.get_queryset()
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Seq scan detection is not supported on {connection.vendor}"
+                )
+            )
+
+        sort_pattern = SORT_PATTERNS.get(connection.vendor)
+        seq_scans = 0
+        with transaction.atomic():
+            if options["force_index"] and connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for name, queryset in self.get_queries():
+                plan = queryset.explain()
+                tables = sorted(set(pattern.findall(plan))) if pattern else []
+                sorts = sorted(set(sort_pattern.findall(plan))) if sort_pattern else []
+
+                problems = []
+                if tables:
+                    problems.append(f"seq scan on {', '.join(tables)}")
+                if sorts:
+                    problems.append(f"sort for {', '.join(sorts)}")
+                if problems:
+                    seq_scans += 1
+                    self.stdout.write(self.style.WARNING(f"{name}: {'; '.join(problems)}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"{name}: OK"))
+
+                if options["plans"]:
+                    self.stdout.write(plan)
+                    self.stdout.write("")
+
+        if seq_scans:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{seq_scans} queries fall back to seq scans or sorts"
+                )
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("All queries use indexes"))
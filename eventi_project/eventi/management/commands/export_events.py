@@ -0,0 +1,62 @@
+# eventi/management/commands/export_events.py
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eventi.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_export
+from eventi.filters import filter_events
+
+# Event list filters accepted as options
+FILTERS = ("q", "categoria", "office", "paese", "settore", "sort", "direction")
+
+
+class Command(BaseCommand):
+    help = "Export events as CSV or gzip-compressed JSON Lines, with the event list filters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=sorted(EXPORT_FORMATS),
+            default="csv",
+            help="Output format (default csv)",
+        )
+        parser.add_argument(
+            "--output",
+            "-o",
+            default="-",
+            help="File to write, '-' for standard output (default)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f"Rows fetched per query round trip (default {EXPORT_CHUNK_SIZE})",
+        )
+        for name in FILTERS:
+            parser.add_argument(f"--{name}", default="", help=f"Event list '{name}' filter")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive number")
+
+        # Like the list's query string: options left empty aren't sent
+        params = {name: options[name] for name in FILTERS if options[name]}
+        chunks = iter_export(
+            filter_events(params), options["format"], options["chunk_size"]
+        )
+
+        if options["output"] == "-":
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+            return
+
+        size = 0
+        with open(options["output"], "wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+                size += len(chunk)
+        self.stdout.write(
+            self.style.SUCCESS(f"Exported {size} bytes to {options['output']}")
+        )
@@ -1,11 +1,37 @@
 # eventi/management/commands/import_csv.py
 import csv
-from django.core.management.base import BaseCommand
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
-from eventi.models import Event
+from django.db import transaction
+from django.utils import timezone
+from eventi.cache import bump_version
+from eventi.models import Event, Settore
+from eventi.search import rebuild_search_index
 
 User = get_user_model()
 
+# Columns written when an existing event is updated in --upsert mode
+UPDATE_FIELDS = [
+    "categoria",
+    "office",
+    "data_fine",
+    "paese",
+    "settore",
+    "tipologia",
+    "descrizione",
+    "public",
+    "privatistica",
+    "last_updated_by",
+    "updated_at",
+]
+
+
+def parse_bool(value, default):
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ["true", "1", "yes", "si", "sì"]
+
 
 class Command(BaseCommand):
     help = "Import events from the provided CSV file"
@@ -13,16 +39,35 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("csv_file", type=str, help="Path to the CSV file")
         parser.add_argument("--user", type=str, help="Username to attribute events to")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of events inserted/updated per query (default 500)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Parse and validate the file, then roll everything back",
+        )
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help="Update events that already exist with the same titolo, data_inizio and citta",
+        )
 
     def handle(self, *args, **options):
         csv_file = options["csv_file"]
         username = options.get("user")
+        self.batch_size = options["batch_size"]
+        if self.batch_size < 1:
+            raise CommandError("--batch-size must be a positive number")
 
         # Get user if specified
-        user = None
+        self.user = None
         if username:
             try:
-                user = User.objects.get(username=username)
+                self.user = User.objects.get(username=username)
                 self.stdout.write(f"Will attribute events to user: {username}")
             except User.DoesNotExist:
                 self.stdout.write(
@@ -31,47 +76,135 @@ class Command(BaseCommand):
                     )
                 )
 
-        # Read CSV and create events
-        events_created = 0
-        events_failed = 0
-
-        with open(csv_file, "r", encoding="utf-8") as file:
-            csv_reader = csv.DictReader(file)
-
-            for row in csv_reader:
-                try:
-                    # Convert boolean string to actual boolean
-                    if "public" in row:
-                        row["public"] = row["public"].lower() in ["true", "1", "yes"]
-
-                    # Create event object
-                    event = Event(
-                        categoria=row.get("categoria", ""),
-                        office=row.get("office", "Belgrado"),
-                        titolo=row.get("titolo", ""),
-                        data_inizio=row.get("data_inizio", None),
-                        data_fine=row.get("data_fine", None),
-                        paese=row.get("paese", "Italia"),
-                        citta=row.get("citta", ""),
-                        settore=row.get("settore", ""),
-                        tipologia=row.get("tipologia", ""),
-                        descrizione=row.get("descrizione", ""),
-                        public=row.get("public", True),
-                        created_by=user,
-                        last_updated_by=user,
-                    )
-                    event.save()
-                    events_created += 1
+        self.counts = {"created": 0, "updated": 0, "skipped": 0, "failed": 0}
 
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f"Error creating event: {str(e)}")
-                    )
-                    self.stdout.write(self.style.ERROR(f"Problematic row: {row}"))
-                    events_failed += 1
+        with transaction.atomic():
+            # One query for all known sectors, the missing ones are created per batch
+            self.settori = dict(Settore.objects.values_list("nome", "id"))
+            existing = self.load_existing() if options["upsert"] else None
+            seen = set()
+
+            batch = []
+            with open(csv_file, "r", encoding="utf-8", newline="") as file:
+                # Line 1 is the header
+                for line_number, row in enumerate(csv.DictReader(file), 2):
+                    try:
+                        event, settore_nome = self.build_event(row)
+                    except (ValidationError, ValueError) as e:
+                        self.stdout.write(
+                            self.style.ERROR(f"Error in line {line_number}: {e}")
+                        )
+                        self.stdout.write(self.style.ERROR(f"Problematic row: {row}"))
+                        self.counts["failed"] += 1
+                        continue
+
+                    if existing is not None:
+                        key = (event.titolo, event.data_inizio, event.citta)
+                        if key in seen:
+                            # Same event twice in the file, stored or not:
+                            # the first row wins
+                            self.counts["skipped"] += 1
+                            continue
+                        seen.add(key)
+                        event.pk = existing.get(key)
+
+                    batch.append((event, settore_nome))
+                    if len(batch) >= self.batch_size:
+                        self.flush(batch)
+                        batch = []
+
+            self.flush(batch)
+            # bulk operations don't send post_save, refresh cached pages
+            transaction.on_commit(lambda: bump_version("events"))
+
+            if options["dry_run"]:
+                transaction.set_rollback(True)
 
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"Import complete: {events_created} events created, {events_failed} failed"
+        summary = (
+            f"{self.counts['created']} events created, "
+            f"{self.counts['updated']} updated, "
+            f"{self.counts['skipped']} duplicates skipped, "
+            f"{self.counts['failed']} failed"
+        )
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"Dry run, nothing saved: {summary}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Import complete: {summary}"))
+
+    def load_existing(self):
+        """Map (titolo, data_inizio, citta) to the id of the events already stored"""
+        return {
+            (titolo, data_inizio, citta): pk
+            for pk, titolo, data_inizio, citta in Event.objects.values_list(
+                "id", "titolo", "data_inizio", "citta"
+            ).iterator(chunk_size=2000)
+        }
+
+    def build_event(self, row):
+        """Build an unsaved Event from a CSV row, returning it with its settore name"""
+        data_inizio_field = Event._meta.get_field("data_inizio")
+        data_fine_field = Event._meta.get_field("data_fine")
+
+        data_inizio = data_inizio_field.to_python(row.get("data_inizio") or None)
+        if data_inizio is None:
+            raise ValueError("data_inizio is required")
+
+        event = Event(
+            categoria=row.get("categoria", ""),
+            office=row.get("office") or "Belgrado",
+            titolo=row.get("titolo", ""),
+            data_inizio=data_inizio,
+            data_fine=data_fine_field.to_python(row.get("data_fine") or None),
+            paese=row.get("paese") or "Italia",
+            citta=row.get("citta", ""),
+            tipologia=row.get("tipologia", ""),
+            descrizione=row.get("descrizione", ""),
+            public=parse_bool(row.get("public"), True),
+            privatistica=parse_bool(row.get("privatistica"), False),
+            created_by=self.user,
+            last_updated_by=self.user,
+        )
+        # The rows are written in bulk, so validate each one here: a bad
+        # value is reported with its line instead of failing the whole batch
+        event.full_clean(
+            exclude=["settore", "created_by", "last_updated_by"],
+            validate_unique=False,
+            validate_constraints=False,
+        )
+        return event, (row.get("settore") or "").strip()
+
+    def flush(self, batch):
+        """Write one batch: create missing sectors, then bulk insert/update events"""
+        if not batch:
+            return
+
+        missing = {nome for _, nome in batch if nome and nome not in self.settori}
+        if missing:
+            Settore.objects.bulk_create(
+                [Settore(nome=nome) for nome in missing], ignore_conflicts=True
+            )
+            self.settori.update(
+                Settore.objects.filter(nome__in=missing).values_list("nome", "id")
             )
+            # bulk_create doesn't send post_save
+            transaction.on_commit(lambda: bump_version("settore"))
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for event, nome in batch:
+            event.settore_id = self.settori.get(nome)
+            if event.pk is None:
+                to_create.append(event)
+            else:
+                event.updated_at = now
+                to_update.append(event)
+
+        Event.objects.bulk_create(to_create, batch_size=self.batch_size)
+        Event.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=self.batch_size)
+        self.counts["created"] += len(to_create)
+        self.counts["updated"] += len(to_update)
+
+        # bulk operations don't send post_save, refresh search data explicitly
+        rebuild_search_index(
+            Event.objects.filter(pk__in=[event.pk for event, _ in batch])
         )
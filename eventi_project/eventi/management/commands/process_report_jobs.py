@@ -0,0 +1,49 @@
+# eventi/management/commands/process_report_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from eventi.jobs import run_report_job
+from eventi.models import ReportJob
+
+
+class Command(BaseCommand):
+    help = "Generate the pending background reports (worker for REPORT_JOBS_BACKEND='db')"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for new jobs instead of exiting when the queue is empty",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds between polls in --loop mode (default 2)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = self.process_pending()
+            if not options["loop"]:
+                break
+            if not processed:
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Report queue processed"))
+
+    def process_pending(self):
+        job_ids = list(
+            ReportJob.objects.filter(status=ReportJob.STATUS_PENDING)
+            .order_by("created_at")
+            .values_list("id", flat=True)
+        )
+        for job_id in job_ids:
+            run_report_job(job_id)
+            job = ReportJob.objects.get(pk=job_id)
+            if job.status == ReportJob.STATUS_DONE:
+                self.stdout.write(f"Job {job_id}: {job.file_key}")
+            elif job.status == ReportJob.STATUS_FAILED:
+                self.stdout.write(self.style.ERROR(f"Job {job_id} failed: {job.error}"))
+        return len(job_ids)
@@ -0,0 +1,90 @@
+# eventi/management/commands/storage_gc.py
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eventi.report_cache import trim_remote
+from eventi.storage import BackblazeB2Storage
+from eventi.storage_gc import (
+    DELETE_BATCH_SIZE,
+    event_file_storage,
+    flush_tombstones,
+    reconcile_bucket,
+)
+
+
+class Command(BaseCommand):
+    help = "Delete the queued event file objects from the bucket"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DELETE_BATCH_SIZE,
+            help=f"Objects deleted per request (default and maximum {DELETE_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--reconcile",
+            action="store_true",
+            help=(
+                "First list the bucket, queue the objects no file references "
+                "and abort the unfinished multipart uploads"
+            ),
+        )
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24.0,
+            help="With --reconcile, skip objects and uploads newer than this (default 24)",
+        )
+        parser.add_argument(
+            "--trim-report-cache",
+            action="store_true",
+            help=(
+                "First evict the oldest cached reports in the bucket beyond "
+                "REPORT_CACHE_REMOTE_MAX_SIZE"
+            ),
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep flushing the queue instead of exiting when it is empty",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60.0,
+            help="Seconds between flushes in --loop mode (default 60)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if not 1 <= batch_size <= DELETE_BATCH_SIZE:
+            raise CommandError(f"--batch-size must be between 1 and {DELETE_BATCH_SIZE}")
+        if not isinstance(event_file_storage(), BackblazeB2Storage):
+            raise CommandError("Event files are not stored in a B2/S3 bucket")
+
+        if options["reconcile"]:
+            queued, aborted = reconcile_bucket(
+                datetime.timedelta(hours=options["grace_hours"])
+            )
+            self.stdout.write(
+                f"{queued} orphaned objects queued, {aborted} stale uploads aborted"
+            )
+
+        if options["trim_report_cache"]:
+            if not settings.REPORT_CACHE_REMOTE:
+                raise CommandError("REPORT_CACHE_REMOTE is not enabled")
+            self.stdout.write(f"{trim_remote()} cached reports evicted")
+
+        while True:
+            deleted, failed = flush_tombstones(batch_size)
+            if deleted or failed:
+                self.stdout.write(f"{deleted} objects deleted, {failed} failed")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Storage queue processed"))
@@ -0,0 +1,111 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+SEARCH_CONFIG = "italian"
+FTS_TABLE = "eventi_event_fts"
+
+
+def create_gin_index(apps, schema_editor):
+    """GIN indexes only exist on PostgreSQL"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Event = apps.get_model("eventi", "Event")
+    schema_editor.add_index(
+        Event,
+        django.contrib.postgres.indexes.GinIndex(
+            fields=["search_vector"], name="event_search_vector_gin"
+        ),
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Event = apps.get_model("eventi", "Event")
+    schema_editor.remove_index(
+        Event,
+        django.contrib.postgres.indexes.GinIndex(
+            fields=["search_vector"], name="event_search_vector_gin"
+        ),
+    )
+
+
+def build_search_index(apps, schema_editor):
+    """
+    Populate the search data for existing events: the search_vector column
+    on PostgreSQL, an FTS5 table for local SQLite databases
+    """
+    Event = apps.get_model("eventi", "Event")
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "postgresql":
+        Event.objects.update(
+            search_vector=(
+                SearchVector("titolo", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("tipologia", "citta", weight="B", config=SEARCH_CONFIG)
+                + SearchVector("descrizione", weight="C", config=SEARCH_CONFIG)
+            )
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "titolo, descrizione, citta, tipologia, "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, titolo, descrizione, citta, tipologia) "
+            "SELECT id, titolo, descrizione, citta, tipologia FROM eventi_event"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventi", "0007_event_privatistica"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="event",
+            name="paese",
+            field=models.CharField(
+                choices=[
+                    ("Italia", "Italia"),
+                    ("Serbia", "Serbia"),
+                    ("Montenegro", "Montenegro"),
+                    ("Altro", "Altro"),
+                ],
+                max_length=50,
+                verbose_name="Paese",
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="event",
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="event_search_vector_gin"
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_gin_index, drop_gin_index),
+            ],
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventi", "0008_event_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["data_inizio", "id"], name="event_data_inizio_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["public", "-data_inizio"], name="event_public_data_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["office", "data_inizio"], name="event_office_data_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["categoria", "data_inizio"], name="event_categoria_data_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["paese", "data_inizio"], name="event_paese_data_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["settore", "data_inizio"], name="event_settore_data_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(condition=models.Q(("public", False)), fields=["created_by", "data_inizio"], name="event_private_creator_idx"),
+        ),
+    ]
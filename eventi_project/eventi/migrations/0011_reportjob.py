@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 12:42
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventi", "0010_event_public_updated_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportJob",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("key", models.CharField(db_index=True, max_length=64, verbose_name="Chiave")),
+                ("export_format", models.CharField(choices=[("docx", "Word (DOCX)"), ("excel", "Excel (XLSX)")], max_length=10, verbose_name="Formato")),
+                ("event_ids", models.JSONField(default=list, verbose_name="Eventi")),
+                ("status", models.CharField(choices=[("pending", "In coda"), ("running", "In corso"), ("done", "Completato"), ("failed", "Fallito")], default="pending", max_length=10, verbose_name="Stato")),
+                ("progress", models.PositiveSmallIntegerField(default=0, verbose_name="Avanzamento")),
+                ("file_key", models.CharField(blank=True, max_length=255, verbose_name="File")),
+                ("error", models.TextField(blank=True, verbose_name="Errore")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Data richiesta")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Data aggiornamento")),
+                ("created_by", models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="report_jobs", to=settings.AUTH_USER_MODEL, verbose_name="Richiesto da")),
+            ],
+            options={
+                "verbose_name": "Report in background",
+                "verbose_name_plural": "Report in background",
+                "ordering": ["-created_at"],
+                "constraints": [models.UniqueConstraint(condition=models.Q(("status__in", ["pending", "running"])), fields=("key",), name="reportjob_unique_active_key")],
+            },
+        ),
+    ]
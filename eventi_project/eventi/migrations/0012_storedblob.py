@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 12:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventi", "0011_reportjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredBlob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("sha256", models.CharField(max_length=64, unique=True, verbose_name="SHA-256")),
+                ("name", models.CharField(max_length=255, verbose_name="Nome nello storage")),
+                ("size", models.BigIntegerField(verbose_name="Dimensione")),
+                ("ref_count", models.PositiveIntegerField(default=0, verbose_name="Riferimenti")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Data creazione")),
+            ],
+            options={
+                "verbose_name": "Blob",
+                "verbose_name_plural": "Blob",
+            },
+        ),
+        migrations.AddField(
+            model_name="eventfile",
+            name="blob",
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name="event_files", to="eventi.storedblob", verbose_name="Blob"),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventi", "0012_storedblob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eventfile",
+            name="checksum",
+            field=models.CharField(blank=True, max_length=64, verbose_name="SHA-256"),
+        ),
+        migrations.AddField(
+            model_name="eventfile",
+            name="content_type",
+            field=models.CharField(blank=True, max_length=100, verbose_name="Content type"),
+        ),
+        migrations.AddField(
+            model_name="eventfile",
+            name="etag",
+            field=models.CharField(blank=True, max_length=100, verbose_name="ETag"),
+        ),
+        migrations.AddField(
+            model_name="eventfile",
+            name="extension",
+            field=models.CharField(blank=True, max_length=10, verbose_name="Estensione"),
+        ),
+        migrations.AddField(
+            model_name="eventfile",
+            name="size",
+            field=models.BigIntegerField(blank=True, null=True, verbose_name="Dimensione"),
+        ),
+        migrations.AddField(
+            model_name="storedblob",
+            name="etag",
+            field=models.CharField(blank=True, max_length=100, verbose_name="ETag"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventi", "0013_eventfile_metadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StorageTombstone",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("key", models.CharField(max_length=1024, unique=True, verbose_name="Chiave")),
+                ("attempts", models.PositiveIntegerField(default=0, verbose_name="Tentativi")),
+                ("last_error", models.TextField(blank=True, verbose_name="Ultimo errore")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Data creazione")),
+            ],
+            options={
+                "verbose_name": "Oggetto da eliminare",
+                "verbose_name_plural": "Oggetti da eliminare",
+            },
+        ),
+    ]
@@ -1,11 +1,16 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 
 from django.core.files.storage import default_storage
 from storages.backends.s3boto3 import S3Boto3Storage
 
+import hashlib
+import mimetypes
 import os
+import uuid
 
 from .storage import BackblazeB2Storage
 
@@ -90,10 +95,36 @@ class Event(models.Model):
     created_at = models.DateTimeField("Data creazione", auto_now_add=True)
     updated_at = models.DateTimeField("Data aggiornamento", auto_now=True)
 
+    # Full-text search data, maintained by eventi.search on save
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         verbose_name = "Evento"
         verbose_name_plural = "Eventi"
         ordering = ["-data_inizio"]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="event_search_vector_gin"),
+            # Default list ordering and year ranges in the report selection
+            models.Index(fields=["data_inizio", "id"], name="event_data_inizio_idx"),
+            # Filters of EventListView and ReportSelectionView, ordered by date
+            models.Index(fields=["public", "-data_inizio"], name="event_public_data_idx"),
+            models.Index(fields=["office", "data_inizio"], name="event_office_data_idx"),
+            models.Index(
+                fields=["categoria", "data_inizio"], name="event_categoria_data_idx"
+            ),
+            models.Index(fields=["paese", "data_inizio"], name="event_paese_data_idx"),
+            models.Index(fields=["settore", "data_inizio"], name="event_settore_data_idx"),
+            # Incremental sync of the public events API
+            models.Index(
+                fields=["public", "updated_at", "id"], name="event_public_updated_idx"
+            ),
+            # Private events are only listed for their creator
+            models.Index(
+                fields=["created_by", "data_inizio"],
+                condition=models.Q(public=False),
+                name="event_private_creator_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.titolo} - {self.citta} ({self.data_inizio})"
@@ -115,6 +146,47 @@ def get_upload_path(instance, filename):
     return f"event_files/{instance.event.id}/{safe_filename}"
 
 
+class StoredBlob(models.Model):
+    """
+    A stored file object, shared by every EventFile with the same content.
+    Blobs are found by the SHA-256 of their bytes and the storage object is
+    deleted when the last EventFile referencing it goes.
+    """
+
+    sha256 = models.CharField("SHA-256", max_length=64, unique=True)
+    name = models.CharField("Nome nello storage", max_length=255)
+    size = models.BigIntegerField("Dimensione")
+    etag = models.CharField("ETag", max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField("Riferimenti", default=0)
+    created_at = models.DateTimeField("Data creazione", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Blob"
+        verbose_name_plural = "Blob"
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count})"
+
+
+class StorageTombstone(models.Model):
+    """
+    A bucket object waiting to be deleted. Deletions only queue the key;
+    the storage_gc command removes the objects in batches.
+    """
+
+    key = models.CharField("Chiave", max_length=1024, unique=True)
+    attempts = models.PositiveIntegerField("Tentativi", default=0)
+    last_error = models.TextField("Ultimo errore", blank=True)
+    created_at = models.DateTimeField("Data creazione", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Oggetto da eliminare"
+        verbose_name_plural = "Oggetti da eliminare"
+
+    def __str__(self):
+        return self.key
+
+
 class EventFile(models.Model):
 
     FILE_TYPE_CHOICES = [
@@ -134,6 +206,15 @@ class EventFile(models.Model):
         storage=BackblazeB2Storage(),
         max_length=255,  # Increase max_length for longer paths
     )
+    # Shared storage object, None for files stored before deduplication
+    blob = models.ForeignKey(
+        StoredBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="event_files",
+        verbose_name="Blob",
+    )
     title = models.CharField("Titolo del file", max_length=255)
 
     file_type = models.CharField(
@@ -141,6 +222,13 @@ class EventFile(models.Model):
     )
     description = models.TextField("Descrizione", blank=True)
 
+    # Metadata captured at upload time, so pages never ask the storage
+    size = models.BigIntegerField("Dimensione", null=True, blank=True)
+    content_type = models.CharField("Content type", max_length=100, blank=True)
+    extension = models.CharField("Estensione", max_length=10, blank=True)
+    etag = models.CharField("ETag", max_length=100, blank=True)
+    checksum = models.CharField("SHA-256", max_length=64, blank=True)
+
     # User tracking fields
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -162,10 +250,102 @@ class EventFile(models.Model):
         return f"{self.title} - {self.event.titolo}"
 
     def save(self, *args, **kwargs):
+        if self.file and not self.file._committed:
+            # A new upload that the storage is about to save
+            self.read_upload_metadata()
+        if not self.extension:
+            self.extension = os.path.splitext(self.file.name)[1].lower()[1:][:10]
+        if not self.content_type:
+            self.content_type = mimetypes.guess_type(self.file.name)[0] or ""
+
         # Auto-detect file type from extension if not provided
         if not self.file_type:
-            filename = self.file.name
-            extension = os.path.splitext(filename)[1].lower().replace(".", "")
-            if extension in [choice[0] for choice in self.FILE_TYPE_CHOICES]:
-                self.file_type = extension
+            if self.extension in [choice[0] for choice in self.FILE_TYPE_CHOICES]:
+                self.file_type = self.extension
         super().save(*args, **kwargs)
+
+    def read_upload_metadata(self):
+        """Fill size, content type and checksum from a not yet saved upload"""
+        upload = self.file.file
+        self.size = upload.size
+        self.content_type = getattr(upload, "content_type", None) or ""
+        checksum = hashlib.sha256()
+        for chunk in self.file.chunks():
+            checksum.update(chunk)
+        self.checksum = checksum.hexdigest()
+        self.etag = ""
+
+
+class ReportJob(models.Model):
+    """
+    A report generated in the background. Identical requests of a user
+    (same events and format) share the same key and are served by a single
+    active job; the file itself is shared through the report cache.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "In coda"),
+        (STATUS_RUNNING, "In corso"),
+        (STATUS_DONE, "Completato"),
+        (STATUS_FAILED, "Fallito"),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+
+    FORMAT_CHOICES = [
+        ("docx", "Word (DOCX)"),
+        ("excel", "Excel (XLSX)"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    key = models.CharField("Chiave", max_length=64, db_index=True)
+    export_format = models.CharField("Formato", max_length=10, choices=FORMAT_CHOICES)
+    event_ids = models.JSONField("Eventi", default=list)
+    status = models.CharField(
+        "Stato", max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    progress = models.PositiveSmallIntegerField("Avanzamento", default=0)
+    file_key = models.CharField("File", max_length=255, blank=True)
+    error = models.TextField("Errore", blank=True)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="report_jobs",
+        verbose_name="Richiesto da",
+    )
+
+    created_at = models.DateTimeField("Data richiesta", auto_now_add=True)
+    updated_at = models.DateTimeField("Data aggiornamento", auto_now=True)
+
+    class Meta:
+        verbose_name = "Report in background"
+        verbose_name_plural = "Report in background"
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=models.Q(status__in=["pending", "running"]),
+                name="reportjob_unique_active_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_export_format_display()} - {self.get_status_display()}"
+
+    @staticmethod
+    def make_key(event_ids, export_format, user_id):
+        """
+        Hash of the requesting user, the sorted event ids and the format.
+        Per user, since jobs are only visible to whoever requested them.
+        """
+        ids = ",".join(str(pk) for pk in sorted(event_ids))
+        return hashlib.sha256(f"{user_id}:{export_format}:{ids}".encode()).hexdigest()
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
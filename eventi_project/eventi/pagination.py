@@ -0,0 +1,158 @@
+# eventi/pagination.py
+from django.core import signing
+from django.db import connection
+from django.db.models import Q
+
+import json
+
+
+class KeysetPage:
+    """
+    A page of results produced by KeysetPaginator.
+    Exposes the cursors for the adjacent pages instead of page numbers.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor (seek) pagination over an ordered queryset.
+
+    The keys are read from the queryset ordering, so the last ordering
+    field must be unique (e.g. "id") to act as a tiebreaker. Instead of
+    OFFSET every page filters on the values of the last row seen, so
+    page N costs the same as page 1 and no COUNT(*) is needed.
+    """
+
+    salt = "eventi.pagination.keyset"
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(queryset.query.order_by)
+        if not self.ordering:
+            raise ValueError("KeysetPaginator requires an ordered queryset")
+
+    def _keys(self, reverse=False):
+        """Return (field, descending) pairs for the current ordering"""
+        keys = []
+        for field in self.ordering:
+            descending = field.startswith("-")
+            keys.append((field.lstrip("-"), descending != reverse))
+        return keys
+
+    def _seek(self, values, reverse=False):
+        """Build the row-value comparison: (k1, k2, ...) > (v1, v2, ...)"""
+        keys = self._keys(reverse)
+        condition = Q()
+        for index, (field, descending) in enumerate(keys):
+            lookup = "lt" if descending else "gt"
+            branch = Q(**{f"{field}__{lookup}": values[index]})
+            for position in range(index):
+                branch &= Q(**{keys[position][0]: values[position]})
+            condition |= branch
+        return condition
+
+    def _values(self, obj):
+        """Read the ordering values from a model instance or a .values() row"""
+        values = []
+        for field, _ in self._keys():
+            if isinstance(obj, dict):
+                value = obj[field]
+            else:
+                value = obj
+                for attr in field.split("__"):
+                    value = getattr(value, attr, None) if value is not None else None
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    def after(self, values):
+        """Return the queryset restricted to the rows after the given key values"""
+        return self.queryset.filter(self._seek(values))
+
+    def encode_cursor(self, obj, direction):
+        return signing.dumps(
+            {"d": direction, "v": self._values(obj)}, salt=self.salt, compress=True
+        )
+
+    def decode_cursor(self, cursor):
+        """Return (direction, values) or (None, None) for a missing/invalid cursor"""
+        if not cursor:
+            return None, None
+        try:
+            data = signing.loads(cursor, salt=self.salt)
+        except signing.BadSignature:
+            return None, None
+        values = data.get("v")
+        if data.get("d") not in ("n", "p") or len(values or []) != len(self.ordering):
+            return None, None
+        return data["d"], values
+
+    def get_page(self, cursor=None):
+        direction, values = self.decode_cursor(cursor)
+        backwards = direction == "p"
+
+        queryset = self.queryset
+        if backwards:
+            queryset = queryset.filter(self._seek(values, reverse=True)).reverse()
+        elif values is not None:
+            queryset = self.after(values)
+
+        # Fetch one extra row to know whether there is another page
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+
+        if backwards:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], "n") if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], "p") if has_previous else None,
+        )
+
+    def approximate_count(self):
+        """
+        Estimate the number of rows without scanning them.
+        Uses the planner estimate on PostgreSQL, falls back to COUNT elsewhere.
+        """
+        queryset = self.queryset.order_by()
+        if connection.vendor != "postgresql":
+            return queryset.count()
+
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
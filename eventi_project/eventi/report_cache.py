@@ -0,0 +1,209 @@
+# eventi/report_cache.py
+"""
+Cache of generated report files.
+
+A report is keyed on what it shows: the sorted event ids with their
+creators' usernames, the latest updated_at, the settore version (reports
+print settore names), the format and, for Word, the template's modification
+time. Any change to one of them gives a new key, so entries never need to
+be invalidated, only evicted.
+
+Files are kept in REPORT_CACHE_DIR, evicted least recently used first
+beyond REPORT_CACHE_MAX_SIZE. With REPORT_CACHE_REMOTE they are also stored
+in the bucket under reports/cache/, so every worker can reuse them; those
+are evicted oldest first beyond REPORT_CACHE_REMOTE_MAX_SIZE by
+trim_remote(), which the storage_gc command runs.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+
+from .cache import get_version
+from .reports import DOCX_TEMPLATE_PATH
+from .storage import REPORT_CACHE_PREFIX, get_s3_client
+
+logger = logging.getLogger(__name__)
+
+# Limit of a single delete_objects request
+DELETE_BATCH_SIZE = 1000
+
+
+def report_cache_key(events, export_format):
+    """
+    Content key of the report of an Event queryset, read with one query.
+    Raises FileNotFoundError if the Word template is missing.
+    """
+    ids = hashlib.sha256()
+    latest = None
+    # Renaming a user doesn't touch updated_at, so the names are part of the key
+    rows = events.order_by("id").values_list(
+        "id", "updated_at", "created_by__username"
+    )
+    for pk, updated_at, username in rows.iterator(chunk_size=2000):
+        ids.update(b"%d:%s," % (pk, (username or "").encode()))
+        if latest is None or updated_at > latest:
+            latest = updated_at
+
+    parts = [
+        export_format,
+        ids.hexdigest(),
+        latest.isoformat() if latest else "",
+        get_version("settore"),
+    ]
+    if export_format == "docx":
+        parts.append(os.stat(DOCX_TEMPLATE_PATH).st_mtime_ns)
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def local_path(key):
+    return os.path.join(settings.REPORT_CACHE_DIR, key)
+
+
+def get_local(key):
+    """Open a cached file and mark it as used, or return None"""
+    path = local_path(key)
+    try:
+        fileobj = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return fileobj
+
+
+def put_local(key, fileobj):
+    """Store a file, then evict the least recently used ones over the limit"""
+    os.makedirs(settings.REPORT_CACHE_DIR, exist_ok=True)
+    # Written aside and renamed, so readers never see a partial file
+    fd, temp_path = tempfile.mkstemp(dir=settings.REPORT_CACHE_DIR, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+        os.replace(temp_path, local_path(key))
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    evict_local()
+
+
+def evict_local():
+    entries = []
+    with os.scandir(settings.REPORT_CACHE_DIR) as scan:
+        for entry in scan:
+            if entry.name.startswith("."):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= settings.REPORT_CACHE_MAX_SIZE:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def get_remote(key):
+    """Copy a file cached in the bucket to the local cache and open it"""
+    try:
+        response = get_s3_client().get_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=REPORT_CACHE_PREFIX + key
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+            logger.exception("Can't read cached report %s", key)
+        return None
+    except BotoCoreError:
+        logger.exception("Can't read cached report %s", key)
+        return None
+
+    body = response["Body"]
+    try:
+        put_local(key, body)
+    finally:
+        body.close()
+    return get_local(key)
+
+
+def put_remote(key, fileobj):
+    """Store a file in the bucket, trim_remote() keeps the total in check"""
+    get_s3_client().put_object(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=REPORT_CACHE_PREFIX + key,
+        Body=fileobj,
+    )
+
+
+def trim_remote():
+    """
+    Evict the oldest files in the bucket beyond REPORT_CACHE_REMOTE_MAX_SIZE.
+    Lists the whole prefix, so it runs periodically rather than on every
+    write. Returns the number of files deleted.
+    """
+    client = get_s3_client()
+    bucket = settings.AWS_STORAGE_BUCKET_NAME
+    objects = []
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=REPORT_CACHE_PREFIX):
+        objects.extend(page.get("Contents", []))
+
+    total = sum(item["Size"] for item in objects)
+    expired = []
+    for item in sorted(objects, key=lambda item: item["LastModified"]):
+        if total <= settings.REPORT_CACHE_REMOTE_MAX_SIZE:
+            break
+        expired.append({"Key": item["Key"]})
+        total -= item["Size"]
+    for start in range(0, len(expired), DELETE_BATCH_SIZE):
+        client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": expired[start : start + DELETE_BATCH_SIZE], "Quiet": True},
+        )
+    return len(expired)
+
+
+def cached_report(events, export_format, generate, progress=None):
+    """
+    Return the report of an Event queryset as a binary file positioned at
+    the start: a cached copy if the same report was generated before,
+    otherwise the result of generate(events, progress=progress), which is
+    cached for the next time. Cache errors never fail the report.
+    """
+    if not settings.REPORT_CACHE_MAX_SIZE:
+        return generate(events, progress=progress)
+
+    key = report_cache_key(events, export_format)
+    try:
+        cached = get_local(key)
+        if cached is None and settings.REPORT_CACHE_REMOTE:
+            cached = get_remote(key)
+    except OSError:
+        logger.exception("Can't read cached report %s", key)
+        cached = None
+    if cached is not None:
+        return cached
+
+    buffer = generate(events, progress=progress)
+    try:
+        put_local(key, buffer)
+        if settings.REPORT_CACHE_REMOTE:
+            buffer.seek(0)
+            put_remote(key, buffer)
+    except (OSError, BotoCoreError, ClientError):
+        logger.exception("Can't cache report %s", key)
+    buffer.seek(0)
+    return buffer
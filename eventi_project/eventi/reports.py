@@ -0,0 +1,448 @@
+# eventi/reports.py
+import copy
+import datetime
+import io
+import itertools
+import multiprocessing
+import operator
+import os
+import re
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.db.models import Max
+from django.db.models.functions import Length
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsmap
+from docxtpl import DocxTemplate
+from jinja2 import Environment
+from lxml import etree
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+from openpyxl.utils import get_column_letter
+
+from .models import Event
+
+EXCEL_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+DOCX_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+)
+
+# Reports up to this size stay in memory, bigger ones spill to a temp file
+SPOOL_MAX_SIZE = 10 * 1024 * 1024
+
+DOCX_TEMPLATE_PATH = os.path.join(
+    settings.BASE_DIR, "eventi", "templates", "eventi", "report_template.docx"
+)
+
+# How often (in rows) the progress callback is called
+PROGRESS_EVERY = 500
+
+# Paragraphs opening and closing the events loop of the Word template
+DOCX_LOOP_START_RE = re.compile(r"{%\s*for\s+event\s+in\s+events\s*%}")
+DOCX_LOOP_END_RE = re.compile(r"{%\s*endfor\s*%}")
+# Temporary attribute locating the loop in the rendered first page
+DOCX_LOOP_MARKER = "eventi-events-loop"
+
+# Columns of the report dataset: (name, field read by the query)
+REPORT_COLUMNS = [
+    ("id", "id"),
+    ("titolo", "titolo"),
+    ("categoria", "categoria"),
+    ("data_inizio", "data_inizio"),
+    ("data_fine", "data_fine"),
+    ("paese", "paese"),
+    ("citta", "citta"),
+    ("settore", "settore__nome"),
+    ("tipologia", "tipologia"),
+    ("descrizione", "descrizione"),
+    ("public", "public"),
+    ("created_by", "created_by__username"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+]
+ReportRow = namedtuple("ReportRow", [name for name, _ in REPORT_COLUMNS])
+
+# (header, dataset column, field whose length gives the column width)
+EXCEL_COLUMNS = [
+    ("ID", "id", None),
+    ("Titolo", "titolo", "titolo"),
+    ("Categoria", "categoria", "categoria"),
+    ("Data Inizio", "data_inizio", None),
+    ("Data Fine", "data_fine", None),
+    ("Paese", "paese", "paese"),
+    ("Città", "citta", "citta"),
+    ("Settore", "settore", "settore__nome"),
+    ("Tipologia", "tipologia", "tipologia"),
+    ("Descrizione", "descrizione", None),
+    ("Pubblico", "public", None),
+    ("Creato Da", "created_by", "created_by__username"),
+    ("Data Creazione", "created_at", None),
+    ("Ultimo Aggiornamento", "updated_at", None),
+]
+# Widths of the columns whose content has a fixed length
+EXCEL_FIXED_LENGTHS = {
+    "data_inizio": 10,
+    "data_fine": 10,
+    "public": 2,
+    "created_at": 16,
+    "updated_at": 16,
+}
+EXCEL_MIN_WIDTH = 10
+EXCEL_MAX_WIDTH = 40
+
+
+def excel_styles():
+    """Named styles shared by every cell instead of one style object per cell"""
+    header = NamedStyle(name="eventi_header")
+    header.font = Font(bold=True, color="FFFFFF")
+    header.fill = PatternFill(start_color="4682B4", end_color="4682B4", fill_type="solid")
+    header.alignment = Alignment(horizontal="center")
+
+    wrap = NamedStyle(name="eventi_wrap")
+    wrap.alignment = Alignment(wrap_text=True)
+    return header, wrap
+
+
+def excel_column_widths(events):
+    """
+    Compute the column widths with one aggregate query.
+    Write-only worksheets need the widths before the first row is written,
+    so they can't be derived from the rows while streaming them.
+    """
+    lengths = events.order_by().aggregate(
+        max_id=Max("id"),
+        **{
+            f"len_{index}": Max(Length(length_field))
+            for index, (_, _, length_field) in enumerate(EXCEL_COLUMNS)
+            if length_field
+        },
+    )
+
+    widths = []
+    for index, (header, column, length_field) in enumerate(EXCEL_COLUMNS):
+        if column == "descrizione":
+            widths.append(EXCEL_MAX_WIDTH)
+            continue
+        if column == "id":
+            length = len(str(lengths["max_id"] or ""))
+        elif length_field:
+            length = lengths[f"len_{index}"] or 0
+        else:
+            length = EXCEL_FIXED_LENGTHS[column]
+        length = max(len(header), length)
+        widths.append(min(max(EXCEL_MIN_WIDTH, length + 2), EXCEL_MAX_WIDTH))
+    return widths
+
+
+def report_rows(events):
+    """
+    Yield the report dataset of an Event queryset as ReportRow tuples.
+    Everything is read by one .values_list() query joining settore and
+    creator, and the values are formatted here once for every exporter.
+    """
+    categoria_labels = dict(Event.CATEGORIA_CHOICES)
+    paese_labels = dict(Event.COUNTRY_CHOICES)
+    rows = events.values_list(*[field for _, field in REPORT_COLUMNS])
+    for (
+        pk,
+        titolo,
+        categoria,
+        data_inizio,
+        data_fine,
+        paese,
+        citta,
+        settore,
+        tipologia,
+        descrizione,
+        public,
+        created_by,
+        created_at,
+        updated_at,
+    ) in rows.iterator(chunk_size=2000):
+        yield ReportRow(
+            pk,
+            titolo,
+            categoria_labels.get(categoria, categoria),
+            data_inizio.strftime("%d/%m/%Y"),
+            data_fine.strftime("%d/%m/%Y") if data_fine else "",
+            paese_labels.get(paese, paese),
+            citta,
+            settore or "",
+            tipologia,
+            descrizione,
+            "Sì" if public else "No",
+            created_by or "",
+            created_at.strftime("%d/%m/%Y %H:%M") if created_at else "",
+            updated_at.strftime("%d/%m/%Y %H:%M") if updated_at else "",
+        )
+
+
+class CachingEnvironment(Environment):
+    """Jinja environment that compiles each template source only once"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compiled = {}
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals or template_class:
+            return super().from_string(source, globals, template_class)
+        template = self.compiled.get(source)
+        if template is None:
+            template = self.compiled[source] = super().from_string(source)
+        return template
+
+
+class CachedDocxTemplate(DocxTemplate):
+    """
+    DocxTemplate built from a parsed prototype: the document is deep-copied
+    instead of unzipped and parsed again, and the patched XML is reused.
+    """
+
+    def __init__(self, entry):
+        super().__init__(entry.path)
+        self.docx = copy.deepcopy(entry.docx)
+        self.jinja_env = entry.jinja_env
+        self.patched_xml = entry.patched_xml
+        self.events_loop = entry.events_loop
+
+    def patch_xml(self, src_xml):
+        patched = self.patched_xml.get(src_xml)
+        if patched is None:
+            patched = self.patched_xml[src_xml] = super().patch_xml(src_xml)
+        return patched
+
+    def render(self, context, jinja_env=None, autoescape=False):
+        super().render(context, jinja_env or self.jinja_env, autoescape)
+
+
+class DocxTemplateEntry:
+    """
+    A parsed template with the caches shared by its renders.
+    With `loop_only`, the body is cut down to the events loop, to render
+    parts of a report that are spliced into its first page.
+    """
+
+    def __init__(self, path, mtime, loop_only=False):
+        self.path = path
+        self.mtime = mtime
+        self.docx = DocxTemplate(path).get_docx()
+        self.events_loop = find_events_loop(self.docx)
+        if loop_only and self.events_loop:
+            keep_events_loop(self.docx, *self.events_loop)
+        self.jinja_env = CachingEnvironment()
+        self.patched_xml = {}
+
+
+def find_events_loop(docx):
+    """
+    Indexes of the body elements opening and closing the events loop, or
+    None if the template has no such loop or its events reference other
+    parts (images, links), which a part can't carry over.
+    """
+    body = list(docx.element.body)
+    start = None
+    for index, element in enumerate(body):
+        text = "".join(element.itertext())
+        if start is None and DOCX_LOOP_START_RE.search(text):
+            start = index
+        if start is not None and DOCX_LOOP_END_RE.search(text):
+            relationship = "{%s}" % nsmap["r"]
+            for child in body[start : index + 1]:
+                for node in child.iter():
+                    if any(name.startswith(relationship) for name in node.attrib):
+                        return None
+            return start, index
+    return None
+
+
+def keep_events_loop(docx, start, end):
+    """Remove everything but the events loop and the section properties"""
+    body = docx.element.body
+    for index, element in reversed(list(enumerate(body))):
+        if not start <= index <= end and not element.tag.endswith("}sectPr"):
+            body.remove(element)
+
+
+_docx_templates = {}
+_docx_templates_lock = threading.Lock()
+
+
+def get_docx_template(path=DOCX_TEMPLATE_PATH, loop_only=False):
+    """
+    Return a fresh, renderable copy of a Word template.
+    Each template is parsed once per process and parsed again only when
+    its modification time changes. Raises FileNotFoundError if missing.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    with _docx_templates_lock:
+        entry = _docx_templates.get((path, loop_only))
+        if entry is None or entry.mtime != mtime:
+            entry = _docx_templates[path, loop_only] = DocxTemplateEntry(
+                path, mtime, loop_only
+            )
+    return CachedDocxTemplate(entry)
+
+
+def render_docx_part(path, events):
+    """
+    Render the events loop of a template for `events`.
+    Returns the rendered body as XML bytes, without the paragraph opening
+    the loop (the first page has it) and the section properties.
+    """
+    doc = get_docx_template(path, loop_only=True)
+    doc.render({"events": events})
+    body = doc.docx.element.body
+    body.remove(body[0])
+    if body.sectPr is not None:
+        body.remove(body.sectPr)
+    return etree.tostring(body)
+
+
+_docx_executor = None
+_docx_executor_lock = threading.Lock()
+
+
+def get_docx_executor():
+    """
+    Process pool rendering the parts of Word reports, created on first use.
+    Returns None where child processes can't be started (daemonic workers,
+    e.g. Celery's prefork pool): the parts are then rendered in-process.
+    """
+    global _docx_executor
+    if multiprocessing.current_process().daemon:
+        return None
+    with _docx_executor_lock:
+        if _docx_executor is None:
+            # Spawned rather than forked from a multi-threaded server; the
+            # workers set up Django to import this module
+            _docx_executor = ProcessPoolExecutor(
+                max_workers=settings.REPORT_DOCX_WORKERS or None,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+    return _docx_executor
+
+
+def reset_docx_executor(executor):
+    """Drop a broken pool, so the next report starts a new one"""
+    global _docx_executor
+    with _docx_executor_lock:
+        if _docx_executor is executor:
+            _docx_executor = None
+
+
+def generate_docx(events, progress=None):
+    """
+    Render the Word report for an Event queryset into an in-memory buffer.
+    Reports bigger than REPORT_DOCX_CHUNK_SIZE events are rendered in parts
+    by a process pool while the first page (header and summary) is rendered
+    once without events; the parts are then spliced in at the loop.
+    `progress`, if given, is called with the number of events processed.
+    Returns the buffer positioned at the start.
+    """
+    # Dicts rather than the tuples: the template uses {{ event.index }},
+    # which must stay undefined instead of resolving to tuple.index
+    context = {
+        "events": [row._asdict() for row in report_rows(events)],
+        "report_date": datetime.datetime.now().strftime("%d/%m/%Y %H:%M"),
+    }
+    context["total_events"] = len(context["events"])
+    chunk_size = settings.REPORT_DOCX_CHUNK_SIZE
+
+    doc = get_docx_template()
+    buffer = io.BytesIO()
+    if context["total_events"] <= chunk_size or not doc.events_loop:
+        if progress:
+            progress(context["total_events"])
+        doc.render(context)
+        doc.save(buffer)
+        buffer.seek(0)
+        return buffer
+
+    events = context["events"]
+    chunks = [events[i : i + chunk_size] for i in range(0, len(events), chunk_size)]
+    # Start the parts first, the first page is rendered meanwhile
+    executor = get_docx_executor()
+    if executor is None:
+        parts = (render_docx_part(DOCX_TEMPLATE_PATH, chunk) for chunk in chunks)
+    else:
+        parts = executor.map(
+            render_docx_part, itertools.repeat(DOCX_TEMPLATE_PATH), chunks
+        )
+
+    # Without events the loop renders to its opening paragraph alone: mark
+    # it to find where the parts go
+    body = doc.docx.element.body
+    body[doc.events_loop[0]].set(DOCX_LOOP_MARKER, "1")
+    doc.render({**context, "events": []})
+    anchor = next(el for el in doc.docx.element.body if el.get(DOCX_LOOP_MARKER))
+    del anchor.attrib[DOCX_LOOP_MARKER]
+
+    done = 0
+    try:
+        for chunk, part in zip(chunks, parts):
+            # The parts come from the same template: styles, numbering and
+            # relationships already match, the elements can be moved as is
+            for element in list(parse_xml(part)):
+                anchor.addnext(element)
+                anchor = element
+            done += len(chunk)
+            if progress:
+                progress(done)
+    except BrokenProcessPool:
+        reset_docx_executor(executor)
+        raise
+    doc.save(buffer)
+
+    buffer.seek(0)
+    return buffer
+
+
+def generate_excel(events, progress=None):
+    """
+    Write the Excel report for an Event queryset into a spooled buffer.
+    The workbook is write-only: rows are streamed from the database and
+    written out directly, so memory stays flat regardless of report size.
+    `progress`, if given, is called with the number of rows written.
+    Returns the buffer positioned at the start.
+    """
+    workbook = Workbook(write_only=True)
+    header_style, wrap_style = excel_styles()
+    workbook.add_named_style(header_style)
+    workbook.add_named_style(wrap_style)
+
+    worksheet = workbook.create_sheet("Eventi Report")
+    for col_num, width in enumerate(excel_column_widths(events), 1):
+        worksheet.column_dimensions[get_column_letter(col_num)].width = width
+
+    header_row = []
+    for header, _, _ in EXCEL_COLUMNS:
+        cell = WriteOnlyCell(worksheet, value=header)
+        cell.style = header_style.name
+        header_row.append(cell)
+    worksheet.append(header_row)
+
+    columns = operator.attrgetter(*[column for _, column, _ in EXCEL_COLUMNS])
+    description_index = [column for _, column, _ in EXCEL_COLUMNS].index("descrizione")
+
+    for count, row in enumerate(report_rows(events), 1):
+        values = list(columns(row))
+        description = WriteOnlyCell(worksheet, value=values[description_index])
+        description.style = wrap_style.name
+        values[description_index] = description
+        worksheet.append(values)
+        if progress and count % PROGRESS_EVERY == 0:
+            progress(count)
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
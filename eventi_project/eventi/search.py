@@ -0,0 +1,124 @@
+# eventi/search.py
+"""
+Full-text search over events.
+
+On PostgreSQL the GIN-indexed Event.search_vector column is matched and
+ranked with SearchRank. On SQLite (local/test runs) the eventi_event_fts
+FTS5 table is matched and ranked with bm25. Any other backend falls back
+to icontains over the same fields.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = "italian"
+SEARCH_FIELDS = ("titolo", "descrizione", "citta", "tipologia")
+FTS_TABLE = "eventi_event_fts"
+
+
+def event_search_vector():
+    """Weighted vector: title first, then type and city, then description"""
+    return (
+        SearchVector("titolo", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("tipologia", "citta", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("descrizione", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def _fts_match(q):
+    """Turn free text into a safe FTS5 query: every word as a quoted prefix"""
+    words = re.findall(r"\w+", q)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_events(queryset, q):
+    """
+    Filter an Event queryset by the search text and annotate it with
+    `search_rank` (higher is more relevant).
+    """
+    vendor = connections[queryset.db].vendor
+
+    if vendor == "postgresql":
+        query = SearchQuery(q, config=SEARCH_CONFIG, search_type="websearch")
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+        )
+
+    match = _fts_match(q)
+    if vendor == "sqlite" and match:
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+            )
+        ).annotate(
+            # bm25() is lower for better matches, negate it to sort like SearchRank
+            search_rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, 10.0, 1.0, 4.0, 4.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = eventi_event.id",
+                [match],
+                output_field=FloatField(),
+            )
+        )
+
+    conditions = Q()
+    for field in SEARCH_FIELDS:
+        conditions |= Q(**{f"{field}__icontains": q})
+    return queryset.filter(conditions).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
+
+
+def update_search_index(event, using="default"):
+    """Refresh the search data of a single event after it has been saved"""
+    connection = connections[using]
+
+    if connection.vendor == "postgresql":
+        type(event).objects.using(using).filter(pk=event.pk).update(
+            search_vector=event_search_vector()
+        )
+    elif connection.vendor == "sqlite":
+        columns = ", ".join(SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [event.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (%s, %s, %s, %s, %s)",
+                [event.pk] + [getattr(event, field) for field in SEARCH_FIELDS],
+            )
+
+
+def rebuild_search_index(queryset):
+    """
+    Refresh the search data of many events with set-based queries,
+    e.g. after bulk_create/bulk_update which don't send post_save
+    """
+    connection = connections[queryset.db]
+
+    if connection.vendor == "postgresql":
+        queryset.update(search_vector=event_search_vector())
+    elif connection.vendor == "sqlite":
+        ids = list(queryset.values_list("id", flat=True))
+        if not ids:
+            return
+        columns = ", ".join(SEARCH_FIELDS)
+        placeholders = ", ".join(["%s"] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", ids
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, {columns}) "
+                f"SELECT id, {columns} FROM eventi_event WHERE id IN ({placeholders})",
+                ids,
+            )
+
+
+def remove_from_search_index(event, using="default"):
+    """Drop a deleted event from the SQLite FTS table"""
+    connection = connections[using]
+
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [event.pk])
@@ -0,0 +1,93 @@
+# eventi/selection.py
+"""
+Event selection for reports.
+
+The selection page is paginated, so "select all matching" can't post the
+ids: it posts a signed token of the filters instead (plus the ids unchecked
+on the page), and GenerateReportView resolves it with the same queryset,
+a range on data_inizio served by the (…, data_inizio) indexes.
+"""
+import datetime
+
+from django.core import signing
+from django.db.models import Max, Min, Q
+
+from .cache import get_or_compute
+from .models import Event
+
+SELECTION_SALT = "eventi.reports.selection"
+# Seconds a "select all matching" token stays valid
+SELECTION_MAX_AGE = 24 * 60 * 60
+SELECTION_FILTERS = ("categoria", "paese", "year")
+
+
+def selection_filters(params):
+    """The report filters of a QueryDict (or dict), as strings"""
+    return {name: params.get(name) or "" for name in SELECTION_FILTERS}
+
+
+def selectable_events(user, categoria="", paese="", year="", exclude=()):
+    """
+    Events `user` may put in a report, filtered like the selection page and
+    ordered by date. An invalid year selects nothing.
+    """
+    if user.is_staff:
+        conditions = Q()
+    else:
+        # One OR in a single query; the private branch uses the partial
+        # (created_by, data_inizio) index
+        conditions = Q(public=True) | Q(public=False, created_by=user)
+
+    if categoria:
+        conditions &= Q(categoria=categoria)
+    if paese:
+        conditions &= Q(paese=paese)
+    if year:
+        # A date range instead of data_inizio__year, so the indexes are used
+        try:
+            year = int(year)
+            conditions &= Q(
+                data_inizio__gte=datetime.date(year, 1, 1),
+                data_inizio__lt=datetime.date(year + 1, 1, 1),
+            )
+        except (ValueError, OverflowError):
+            return Event.objects.none()
+
+    events = Event.objects.filter(conditions)
+    if exclude:
+        events = events.exclude(pk__in=exclude)
+    return events.order_by("data_inizio", "id")
+
+
+def dump_selection(user, filters):
+    """Sign the filters of a "select all matching" selection for `user`"""
+    return signing.dumps({"u": user.pk, **filters}, salt=SELECTION_SALT, compress=True)
+
+
+def load_selection(token, user):
+    """
+    Return the filters of a selection token.
+    Raises ValueError if it's invalid, expired or signed for another user.
+    """
+    try:
+        data = signing.loads(token, salt=SELECTION_SALT, max_age=SELECTION_MAX_AGE)
+    except signing.BadSignature:
+        raise ValueError("Selezione scaduta o non valida.")
+    if data.get("u") != user.pk:
+        raise ValueError("Selezione non valida.")
+    return selection_filters(data)
+
+
+def event_years():
+    """Years from the first to the last event, from one MIN/MAX query"""
+    dates = Event.objects.order_by().aggregate(
+        first=Min("data_inizio"), last=Max("data_inizio")
+    )
+    if dates["first"] is None:
+        return []
+    return list(range(dates["first"].year, dates["last"].year + 1))
+
+
+def selection_years():
+    """Year choices of the selection page, cached until the next event write"""
+    return get_or_compute("events", "years", event_years)
@@ -0,0 +1,40 @@
+# eventi/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .blobs import release_blob
+from .cache import bump_version
+from .models import Event, EventFile, Settore
+from .search import remove_from_search_index, update_search_index
+from .storage_gc import enqueue_deletion
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, using, raw=False, **kwargs):
+    """Keep the full-text search data in sync with the event"""
+    if raw:
+        return
+    update_search_index(instance, using=using)
+    bump_version("events")
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted(sender, instance, using, **kwargs):
+    remove_from_search_index(instance, using=using)
+    bump_version("events")
+
+
+@receiver(post_save, sender=Settore)
+@receiver(post_delete, sender=Settore)
+def settore_changed(sender, **kwargs):
+    """New settore choices for every worker"""
+    bump_version("settore")
+
+
+@receiver(post_delete, sender=EventFile)
+def event_file_deleted(sender, instance, **kwargs):
+    """Drop the file's reference on its shared blob, or queue its object"""
+    if instance.blob_id:
+        release_blob(instance.blob_id)
+    elif instance.file:
+        enqueue_deletion(instance.file.name)
@@ -1,5 +1,123 @@
 # eventi/storage.py
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+from django.core.cache import cache
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+REPORTS_PREFIX = "reports/"
+# Cached report artifacts (see report_cache), not listed with the reports
+REPORT_CACHE_PREFIX = "reports/cache/"
+REPORT_FILES_CACHE_KEY = "eventi:report_files"
+
+_s3_resource = None
+_s3_lock = threading.Lock()
+_s3_local = threading.local()
+
+
+def s3_client_config():
+    """Client settings for the B2 bucket: pooled keep-alive connections"""
+    options = {}
+    if not settings.AWS_S3_CHECKSUMS_ENABLED:
+        # B2 rejects the checksum headers newer botocore sends by default
+        options["request_checksum_calculation"] = "when_required"
+        options["response_checksum_validation"] = "when_required"
+    return Config(
+        signature_version=settings.AWS_S3_SIGNATURE_VERSION,
+        s3={
+            "addressing_style": settings.AWS_S3_ADDRESSING_STYLE,
+            "payload_signing_enabled": False,
+        },
+        max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+        connect_timeout=settings.AWS_S3_CONNECT_TIMEOUT,
+        read_timeout=settings.AWS_S3_READ_TIMEOUT,
+        retries={"max_attempts": 3, "mode": "standard"},
+        tcp_keepalive=True,
+        **options,
+    )
+
+
+def _base_resource():
+    global _s3_resource
+    with _s3_lock:
+        if _s3_resource is None:
+            session = boto3.session.Session(
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            )
+            _s3_resource = session.resource(
+                "s3",
+                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                region_name=settings.AWS_S3_REGION_NAME,
+                verify=settings.AWS_S3_VERIFY,
+                config=s3_client_config(),
+            )
+    return _s3_resource
+
+
+def get_s3_client():
+    """
+    The S3 client shared by the whole process. boto3 clients are
+    thread-safe, so credentials, endpoint metadata and the connection pool
+    are set up once instead of on every request.
+    """
+    return _base_resource().meta.client
+
+
+def get_s3_resource():
+    """
+    S3 resource for the current thread. Resources aren't thread-safe, but
+    they are cheap wrappers: every thread's resource uses the shared client.
+    """
+    resource = getattr(_s3_local, "resource", None)
+    if resource is None:
+        base = _base_resource()
+        resource = _s3_local.resource = type(base)(client=base.meta.client)
+    return resource
+
+
+def list_report_files():
+    """
+    All the reports stored under reports/, newest first. The listing follows
+    continuation tokens past the 1000 keys of a single list_objects_v2 call
+    and is cached for REPORT_FILES_CACHE_TIMEOUT seconds.
+    """
+    files = cache.get(REPORT_FILES_CACHE_KEY)
+    if files is not None:
+        return files
+
+    files = []
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix=REPORTS_PREFIX
+    ):
+        for item in page.get("Contents", []):
+            # Skip the directory itself and the cached artifacts
+            if item["Key"] == REPORTS_PREFIX or item["Key"].startswith(
+                REPORT_CACHE_PREFIX
+            ):
+                continue
+            files.append(
+                {
+                    "key": item["Key"],
+                    "name": os.path.basename(item["Key"]),
+                    "size": item["Size"],
+                    "last_modified": item["LastModified"],
+                }
+            )
+
+    files.sort(key=lambda x: x["last_modified"], reverse=True)
+    cache.set(REPORT_FILES_CACHE_KEY, files, settings.REPORT_FILES_CACHE_TIMEOUT)
+    return files
+
+
+def invalidate_report_files():
+    """Forget the cached listing after a report is saved or deleted"""
+    cache.delete(REPORT_FILES_CACHE_KEY)
 
 
 class BackblazeB2Storage(S3Boto3Storage):
@@ -8,3 +126,12 @@ class BackblazeB2Storage(S3Boto3Storage):
     """
 
     location = "event_files"  # Optional subfolder in your bucket
+
+    @property
+    def connection(self):
+        # Reuse the shared client instead of one client per thread
+        return get_s3_resource()
+
+    def object_key(self, name):
+        """Bucket key of a stored file name, i.e. the name under `location`"""
+        return self._normalize_name(clean_name(name))
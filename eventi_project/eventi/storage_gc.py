@@ -0,0 +1,162 @@
+# eventi/storage_gc.py
+"""
+Garbage collection of event file objects in the bucket.
+
+Deleting an EventFile (directly or through its event) or the last
+reference to a blob only queues the object key as a StorageTombstone, in
+the same transaction as the row. flush_tombstones() then removes the
+objects with delete_objects, up to 1000 keys per request, and
+reconcile_bucket() queues the objects that no row references any more and
+aborts the multipart uploads a browser never completed.
+"""
+import datetime
+import logging
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EventFile, StorageTombstone, StoredBlob
+
+logger = logging.getLogger(__name__)
+
+# Limit of a single delete_objects request
+DELETE_BATCH_SIZE = 1000
+
+
+def event_file_storage():
+    return EventFile._meta.get_field("file").storage
+
+
+def enqueue_deletion(*names):
+    """Queue stored file names (as saved in EventFile.file) for deletion"""
+    storage = event_file_storage()
+    StorageTombstone.objects.bulk_create(
+        [StorageTombstone(key=storage.object_key(name)) for name in names if name],
+        ignore_conflicts=True,
+    )
+
+
+def referenced_keys(keys):
+    """The subset of `keys` still used by an EventFile or a blob"""
+    storage = event_file_storage()
+    names = {key[len(storage.location) + 1 :]: key for key in keys}
+    used = set(EventFile.objects.filter(file__in=names).values_list("file", flat=True))
+    used.update(StoredBlob.objects.filter(name__in=names).values_list("name", flat=True))
+    return {names[name] for name in used}
+
+
+def flush_tombstones(batch_size=DELETE_BATCH_SIZE, max_attempts=5):
+    """
+    Delete the queued objects, batch_size keys per request.
+    Returns (deleted, failed). Keys that are referenced again are dropped
+    from the queue without touching the object.
+    """
+    storage = event_file_storage()
+    client = storage.connection.meta.client
+    batch_size = min(batch_size, DELETE_BATCH_SIZE)
+    deleted = failed = 0
+    last_pk = 0
+
+    while True:
+        tombstones = list(
+            StorageTombstone.objects.filter(pk__gt=last_pk, attempts__lt=max_attempts)
+            .order_by("pk")
+            .values_list("pk", "key")[:batch_size]
+        )
+        if not tombstones:
+            break
+        last_pk = tombstones[-1][0]
+
+        keys = {key: pk for pk, key in tombstones}
+        in_use = referenced_keys(keys)
+        to_delete = [key for key in keys if key not in in_use]
+
+        errors = {}
+        if to_delete:
+            try:
+                response = client.delete_objects(
+                    Bucket=storage.bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in to_delete], "Quiet": True},
+                )
+                errors = {
+                    error["Key"]: error.get("Message", error.get("Code", ""))
+                    for error in response.get("Errors", [])
+                }
+            except (BotoCoreError, ClientError) as e:
+                logger.exception("Storage GC batch failed")
+                errors = {key: str(e) for key in to_delete}
+
+        for key, message in errors.items():
+            StorageTombstone.objects.filter(pk=keys[key]).update(
+                attempts=F("attempts") + 1, last_error=message
+            )
+        StorageTombstone.objects.filter(
+            pk__in=[pk for key, pk in keys.items() if key not in errors]
+        ).delete()
+        deleted += len(to_delete) - len(errors)
+        failed += len(errors)
+
+    return deleted, failed
+
+
+def abort_stale_uploads(cutoff):
+    """
+    Abort the multipart uploads under the event files location started
+    before `cutoff`. Their parts are billed but never listed as objects.
+    Returns the number of uploads aborted.
+    """
+    storage = event_file_storage()
+    client = storage.connection.meta.client
+    aborted = 0
+
+    paginator = client.get_paginator("list_multipart_uploads")
+    for page in paginator.paginate(
+        Bucket=storage.bucket_name, Prefix=f"{storage.location}/"
+    ):
+        for upload in page.get("Uploads", []):
+            if upload["Initiated"] >= cutoff:
+                continue
+            try:
+                client.abort_multipart_upload(
+                    Bucket=storage.bucket_name,
+                    Key=upload["Key"],
+                    UploadId=upload["UploadId"],
+                )
+            except ClientError:
+                logger.exception("Can't abort the upload of %s", upload["Key"])
+                continue
+            aborted += 1
+    return aborted
+
+
+def reconcile_bucket(grace=datetime.timedelta(days=1)):
+    """
+    Queue the objects under the event files location that no EventFile or
+    blob references, and abort the multipart uploads left unfinished.
+    Objects and uploads newer than `grace` are left alone: they may belong
+    to an upload that hasn't been confirmed yet.
+    Returns (keys queued, uploads aborted).
+    """
+    storage = event_file_storage()
+    client = storage.connection.meta.client
+    cutoff = timezone.now() - grace
+    aborted = abort_stale_uploads(cutoff)
+    queued = 0
+
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=storage.bucket_name, Prefix=f"{storage.location}/"
+    ):
+        candidates = [
+            item["Key"] for item in page.get("Contents", [])
+            if item["LastModified"] < cutoff
+        ]
+        if not candidates:
+            continue
+        orphans = set(candidates) - referenced_keys(candidates)
+        StorageTombstone.objects.bulk_create(
+            [StorageTombstone(key=key) for key in orphans], ignore_conflicts=True
+        )
+        queued += len(orphans)
+    return queued, aborted
@@ -0,0 +1,10 @@
+# eventi/tasks.py
+# Celery tasks, used when REPORT_JOBS_BACKEND = "celery"
+from eventi_project.celery import app
+
+from .jobs import run_report_job
+
+
+@app.task(ignore_result=True)
+def generate_report_task(job_id):
+    run_report_job(job_id)
@@ -5,10 +5,19 @@ register = template.Library()
 
 
 @register.simple_tag(takes_context=True)
-def page_url(context, page_number):
-    """Generate pagination URL while preserving all other query parameters"""
+def page_url(context, page_number=None, cursor=None):
+    """
+    Generate pagination URL while preserving all other query parameters.
+    Pass either a page number (offset pagination) or an opaque cursor
+    (keyset pagination); the other parameter is dropped from the URL.
+    """
     request = context["request"]
     query_dict = request.GET.copy()
-    query_dict["page"] = page_number
+    query_dict.pop("page", None)
+    query_dict.pop("cursor", None)
+    if cursor:
+        query_dict["cursor"] = cursor
+    elif page_number is not None:
+        query_dict["page"] = page_number
 
     return f"?{query_dict.urlencode()}"
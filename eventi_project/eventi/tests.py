@@ -1,3 +1,783 @@
-from django.test import TestCase
+import csv
+import datetime
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+import boto3
+from botocore.stub import Stubber
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .blobs import acquire_blob, register_blob, release_blob
+from .cache import clear_local_cache
+from .models import Event, EventFile, ReportJob, Settore, StorageTombstone, StoredBlob
+from .report_cache import report_cache_key, trim_remote
+from .reports import generate_docx, generate_excel
+from .storage import REPORT_CACHE_PREFIX, BackblazeB2Storage, s3_client_config
+from .storage_gc import event_file_storage, flush_tombstones, reconcile_bucket
+from .uploads import checksum_sha256, complete_upload, save_event_file, start_upload
+
+User = get_user_model()
+
+
+# Silk records every query (and runs EXPLAIN on it) once its middleware has run
+without_silk = override_settings(
+    MIDDLEWARE=[m for m in settings.MIDDLEWARE if not m.startswith("silk.")]
+)
+
+
+def stub_event_file_storage(testcase):
+    """
+    The event file storage on a stubbed client, for the length of a test.
+    The storage and the shared client are built from the AWS_* environment,
+    so the bucket and the credentials (needed to presign) are pinned here.
+    """
+    storage = event_file_storage()
+    resource = boto3.session.Session(
+        aws_access_key_id="test", aws_secret_access_key="test"
+    ).resource("s3", region_name="us-east-1", config=s3_client_config())
+    for patcher in [
+        mock.patch.object(storage, "bucket_name", "test-bucket"),
+        mock.patch("eventi.storage._s3_resource", resource),
+        mock.patch("eventi.storage._s3_local", threading.local()),
+    ]:
+        patcher.start()
+        testcase.addCleanup(patcher.stop)
+    stubber = Stubber(storage.connection.meta.client)
+    stubber.activate()
+    testcase.addCleanup(stubber.deactivate)
+    return storage, stubber
+
+
+@without_silk
+class QueryBudgetTests(TestCase):
+    """
+    Query-count budgets for the main pages: the number of queries must not
+    grow with the number of events or files shown.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("autore", password="password")
+        cls.other = User.objects.create_user("altro", password="password")
+        settore = Settore.objects.create(nome="Settore di prova")
+        cls.events = [
+            Event.objects.create(
+                categoria=Event.CATEGORIA_CHOICES[0][0],
+                office="Belgrado",
+                titolo=f"Evento {i}",
+                data_inizio=datetime.date(2025, 1, i + 1),
+                paese="Italia",
+                citta="Roma",
+                settore=settore,
+                tipologia="Fiera",
+                descrizione="Descrizione",
+                created_by=cls.user if i % 2 else cls.other,
+            )
+            for i in range(8)
+        ]
+        for i in range(5):
+            EventFile.objects.create(
+                event=cls.events[0],
+                file=f"event_files/{cls.events[0].id}/file-{i}.pdf",
+                title=f"File {i}",
+                created_by=cls.user if i % 2 else cls.other,
+            )
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+
+    def test_event_list_anonymous(self):
+        # COUNT, events with settore, settore choices
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("event_list"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_event_list_anonymous_page_cache(self):
+        url = reverse("event_list") + "?categoria=&page=1"
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, "EVENTO 7")
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+
+        # Any event write invalidates the cached pages
+        self.events[7].titolo = "Evento modificato"
+        self.events[7].save()
+        self.assertContains(self.client.get(url), "EVENTO MODIFICATO")
+
+    def test_event_list_page_cache_key_keeps_empty_values(self):
+        # "sort=" disables the relevance order of a search: another page
+        url = reverse("event_list")
+        self.client.get(url, {"q": "evento"})
+        # Rendered, not cached: COUNT, events (settore choices are cached)
+        with self.assertNumQueries(2):
+            self.client.get(url, {"q": "evento", "sort": ""})
+
+    def test_event_list_authenticated(self):
+        self.client.force_login(self.user)
+        # session, user, COUNT, events with settore, settore choices
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("event_list"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_event_detail_with_files(self):
+        self.client.force_login(self.user)
+        # session, user, event with settore, files with uploaders; no URL
+        # signing, the file metadata is read from the rows
+        with self.assertNumQueries(4), mock.patch.object(
+            BackblazeB2Storage, "url", side_effect=AssertionError("storage call")
+        ):
+            response = self.client.get(
+                reverse("event_detail", kwargs={"pk": self.events[0].pk})
+            )
+        self.assertContains(response, "File 4")
+
+    def test_report_exporters(self):
+        events = Event.objects.order_by("data_inizio")
+        # One joined query for the rows
+        with self.assertNumQueries(1):
+            docx = generate_docx(events)
+        self.assertTrue(docx.getvalue())
+        # Column widths aggregate, rows
+        with self.assertNumQueries(2):
+            excel = generate_excel(events)
+        self.assertTrue(excel.read())
+
+    def test_report_selection(self):
+        self.client.force_login(self.user)
+        # session, user, page of events, year range
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("report_selection"))
+        self.assertContains(response, "Evento 7")
+
+
+@without_silk
+class EventExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("autore", password="password")
+        cls.other = User.objects.create_user("altro", password="password")
+        for titolo, public in (("Evento pubblico", True), ("Evento privato", False)):
+            Event.objects.create(
+                categoria=Event.CATEGORIA_CHOICES[0][0],
+                office="Belgrado",
+                titolo=titolo,
+                data_inizio=datetime.date(2025, 1, 1),
+                paese="Italia",
+                citta="Roma",
+                tipologia="Fiera",
+                descrizione=f"Descrizione di {titolo}",
+                public=public,
+                created_by=cls.owner,
+            )
+
+    def export(self, user):
+        self.client.force_login(user)
+        response = self.client.get(reverse("event_export"), {"format": "csv"})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_private_events_hidden_from_other_users(self):
+        content = self.export(self.other)
+        self.assertIn("Evento pubblico", content)
+        self.assertNotIn("Evento privato", content)
+
+    def test_private_events_exported_to_owner_and_staff(self):
+        self.assertIn("Evento privato", self.export(self.owner))
+        self.other.is_staff = True
+        self.other.save()
+        self.assertIn("Evento privato", self.export(self.other))
+
+
+@without_silk
+@override_settings(REPORT_JOBS_BACKEND="db")
+class ReportJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("autore", password="password")
+        cls.other = User.objects.create_user("altro", password="password")
+        cls.event = Event.objects.create(
+            categoria=Event.CATEGORIA_CHOICES[0][0],
+            office="Belgrado",
+            titolo="Evento",
+            data_inizio=datetime.date(2025, 1, 1),
+            paese="Italia",
+            citta="Roma",
+            tipologia="Fiera",
+            created_by=cls.user,
+        )
+
+    def submit(self, user):
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse("generate_report"),
+            {"event_ids": [self.event.pk], "export_format": "excel", "background": "true"},
+            headers={"accept": "application/json"},
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_identical_request_reuses_active_job(self):
+        first = self.submit(self.user)
+        self.assertEqual(self.submit(self.user)["job_id"], first["job_id"])
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+    def test_jobs_are_not_shared_between_users(self):
+        first = self.submit(self.user)
+        second = self.submit(self.other)
+        self.assertNotEqual(second["job_id"], first["job_id"])
+
+        # Each user can poll their own job, and only that
+        response = self.client.get(second["status_url"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], ReportJob.STATUS_PENDING)
+        self.assertEqual(self.client.get(first["status_url"]).status_code, 404)
+
+
+@without_silk
+@override_settings(AWS_STORAGE_BUCKET_NAME="test-bucket")
+class ReportCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("autore", password="password")
+        Event.objects.create(
+            titolo="Evento", data_inizio=datetime.date(2025, 1, 1), created_by=cls.user
+        )
+
+    def test_key_follows_creator_username(self):
+        key = report_cache_key(Event.objects.all(), "excel")
+        User.objects.filter(pk=self.user.pk).update(username="rinominato")
+        self.assertNotEqual(report_cache_key(Event.objects.all(), "excel"), key)
+
+    @override_settings(REPORT_CACHE_REMOTE_MAX_SIZE=25)
+    def test_trim_remote_evicts_oldest(self):
+        _, stubber = stub_event_file_storage(self)
+        now = timezone.now()
+        stubber.add_response(
+            "list_objects_v2",
+            {
+                "Contents": [
+                    {
+                        "Key": f"{REPORT_CACHE_PREFIX}{name}",
+                        "Size": 10,
+                        "LastModified": now - age,
+                    }
+                    for name, age in [
+                        ("nuovo", datetime.timedelta(hours=1)),
+                        ("vecchio", datetime.timedelta(days=2)),
+                        ("medio", datetime.timedelta(days=1)),
+                    ]
+                ]
+            },
+            {"Bucket": "test-bucket", "Prefix": REPORT_CACHE_PREFIX},
+        )
+        stubber.add_response(
+            "delete_objects",
+            {},
+            {
+                "Bucket": "test-bucket",
+                "Delete": {
+                    "Objects": [{"Key": f"{REPORT_CACHE_PREFIX}vecchio"}],
+                    "Quiet": True,
+                },
+            },
+        )
+
+        self.assertEqual(trim_remote(), 1)
+        stubber.assert_no_pending_responses()
+
+
+@without_silk
+class EventFileUploadTests(TestCase):
+    """Uploads streamed to the bucket, for content that is already stored"""
+
+    content = b"contenuto del file"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("autore", password="password")
+        cls.event = Event.objects.create(
+            categoria=Event.CATEGORIA_CHOICES[0][0],
+            office="Belgrado",
+            titolo="Evento",
+            data_inizio=datetime.date(2025, 1, 1),
+            paese="Italia",
+            citta="Roma",
+            tipologia="Fiera",
+            created_by=cls.user,
+        )
+        cls.blob = StoredBlob.objects.create(
+            sha256=hashlib.sha256(cls.content).hexdigest(),
+            name=f"event_files/{cls.event.pk}/originale.pdf",
+            size=len(cls.content),
+            ref_count=1,
+        )
+
+    def setUp(self):
+        # No bucket here: the name is free and the known content is not sent
+        patcher = mock.patch.object(
+            BackblazeB2Storage, "get_available_name", side_effect=lambda name, **kw: name
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self):
+        self.client.force_login(self.user)
+        return self.client.post(
+            reverse("event_file_upload", kwargs={"pk": self.event.pk}),
+            {"file": SimpleUploadedFile("copia.pdf", self.content), "title": "Copia"},
+        )
+
+    def test_upload_references_existing_blob(self):
+        self.upload()
+        event_file = EventFile.objects.get(event=self.event)
+        self.assertEqual(event_file.blob, self.blob)
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.ref_count, 2)
+
+    def test_form_upload_references_existing_blob(self):
+        # Files attached through the event forms go through the same blobs
+        upload = SimpleUploadedFile("copia.pdf", self.content)
+        with mock.patch.object(
+            BackblazeB2Storage, "save", side_effect=AssertionError("stored again")
+        ):
+            event_file = save_event_file(self.event, upload, self.user, "Copia")
+        self.assertEqual(event_file.blob, self.blob)
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.ref_count, 2)
+
+    def test_form_upload_of_new_content_creates_blob(self):
+        upload = SimpleUploadedFile("nuovo.pdf", b"altro contenuto")
+        name = f"event_files/{self.event.pk}/nuovo.pdf"
+        with mock.patch.object(BackblazeB2Storage, "save", return_value=name):
+            event_file = save_event_file(self.event, upload, self.user, "Nuovo")
+        self.assertEqual(event_file.file.name, name)
+        self.assertEqual(event_file.blob.name, name)
+        self.assertEqual(event_file.blob.ref_count, 1)
+        self.assertEqual(
+            event_file.checksum, hashlib.sha256(b"altro contenuto").hexdigest()
+        )
+
+    def test_rejected_upload_releases_blob(self):
+        # A CSRF cookie but no token: the body is read, then the check fails
+        self.client = self.client_class(enforce_csrf_checks=True)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = "a" * 32
+        self.assertEqual(self.upload().status_code, 403)
+        self.assertFalse(EventFile.objects.exists())
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.ref_count, 1)
+
+
+@without_silk
+class DirectUploadTests(TestCase):
+    """Uploads the browser sends straight to a stubbed bucket"""
+
+    content = b"contenuto del file"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("autore", password="password")
+        cls.event = Event.objects.create(
+            titolo="Evento", data_inizio=datetime.date(2025, 1, 1), created_by=cls.user
+        )
+        cls.sha256 = hashlib.sha256(cls.content).hexdigest()
+
+    def setUp(self):
+        patcher = mock.patch.object(
+            BackblazeB2Storage, "get_available_name", side_effect=lambda name, **kw: name
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage, self.stubber = stub_event_file_storage(self)
+
+    def upload(self, checksum):
+        """Start an upload with the content's hash and confirm it"""
+        data = start_upload(
+            self.event, "nuovo.pdf", len(self.content), "application/pdf", self.sha256
+        )
+        self.assertEqual(
+            data["headers"]["x-amz-checksum-sha256"], checksum_sha256(self.sha256)
+        )
+        key = self.storage.object_key(data["name"])
+        response = {"ContentLength": len(self.content), "ETag": '"etag"'}
+        if checksum:
+            response["ChecksumSHA256"] = checksum
+        self.stubber.add_response(
+            "head_object",
+            response,
+            {"Bucket": self.storage.bucket_name, "Key": key, "ChecksumMode": "ENABLED"},
+        )
+        return data["name"], complete_upload(self.event, data["token"])
+
+    def test_verified_upload_becomes_blob(self):
+        name, (stored_name, blob, metadata) = self.upload(checksum_sha256(self.sha256))
+        self.assertEqual(stored_name, name)
+        self.assertEqual(blob.sha256, self.sha256)
+        self.assertEqual(blob.ref_count, 1)
+        self.assertEqual(metadata["checksum"], self.sha256)
+
+    def test_verified_upload_of_stored_content_is_shared(self):
+        existing = StoredBlob.objects.create(
+            sha256=self.sha256, name="event_files/1/originale.pdf", size=1, ref_count=1
+        )
+        name, (stored_name, blob, _) = self.upload(checksum_sha256(self.sha256))
+        self.assertEqual(blob.pk, existing.pk)
+        self.assertEqual(stored_name, existing.name)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+        # The second copy goes
+        self.assertTrue(
+            StorageTombstone.objects.filter(key=self.storage.object_key(name)).exists()
+        )
+
+    def test_known_hash_is_not_revealed(self):
+        StoredBlob.objects.create(
+            sha256=self.sha256, name="event_files/1/originale.pdf", size=1, ref_count=1
+        )
+        data = start_upload(
+            self.event, "nuovo.pdf", len(self.content), "application/pdf", self.sha256
+        )
+        # The bytes must be sent all the same, and no reference is taken
+        self.assertNotIn("exists", data)
+        self.assertIn("url", data)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_unverified_upload_is_not_a_blob(self):
+        _, (_, blob, metadata) = self.upload(None)
+        self.assertIsNone(blob)
+        self.assertEqual(metadata["checksum"], "")
+        self.assertFalse(StoredBlob.objects.exists())
+
+
+@without_silk
+@override_settings(EVENT_FILE_DOWNLOAD_MODE="proxy")
+class EventFileDownloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("autore", password="password")
+        event = Event.objects.create(
+            titolo="Evento", data_inizio=datetime.date(2025, 1, 1), created_by=cls.user
+        )
+        cls.event_file = EventFile.objects.create(
+            event=event, file="event_files/1/grande.pdf", size=10**9, created_by=cls.user
+        )
+
+    def test_range_is_fetched_from_the_bucket(self):
+        storage, stubber = stub_event_file_storage(self)
+        stubber.add_response(
+            "get_object",
+            {
+                "Body": mock.Mock(iter_chunks=lambda size: iter([b"fine"])),
+                "ContentLength": 4,
+                "ContentRange": f"bytes {10**9 - 4}-{10**9 - 1}/{10**9}",
+            },
+            {
+                "Bucket": storage.bucket_name,
+                "Key": storage.object_key(self.event_file.file.name),
+                "Range": "bytes=-4",
+            },
+        )
+
+        self.client.force_login(self.user)
+        with mock.patch.object(
+            BackblazeB2Storage, "open", side_effect=AssertionError("whole object")
+        ):
+            response = self.client.get(
+                reverse(
+                    "event_file_download",
+                    kwargs={
+                        "event_pk": self.event_file.event_id,
+                        "file_pk": self.event_file.pk,
+                    },
+                ),
+                headers={"range": "bytes=-4"},
+            )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), b"fine")
+        stubber.assert_no_pending_responses()
+
+
+@without_silk
+class StorageGCTests(TestCase):
+    """Blob references and the deletion queue, against a stubbed bucket"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("autore", password="password")
+        cls.event = Event.objects.create(
+            categoria=Event.CATEGORIA_CHOICES[0][0],
+            office="Belgrado",
+            titolo="Evento",
+            data_inizio=datetime.date(2025, 1, 1),
+            paese="Italia",
+            citta="Roma",
+            tipologia="Fiera",
+            created_by=cls.user,
+        )
+
+    def setUp(self):
+        self.storage, self.stubber = stub_event_file_storage(self)
+        self.bucket = self.storage.bucket_name
+
+    def key(self, name):
+        return self.storage.object_key(name)
+
+    def tombstones(self):
+        return set(StorageTombstone.objects.values_list("key", flat=True))
+
+    def test_blob_references(self):
+        blob, created = register_blob("a" * 64, "event_files/1/a.pdf", 10)
+        self.assertTrue(created)
+        self.assertEqual(blob.ref_count, 1)
+        self.assertEqual(acquire_blob("a" * 64).ref_count, 2)
+        self.assertEqual(acquire_blob(pk=blob.pk).ref_count, 3)
+        self.assertIsNone(acquire_blob("b" * 64))
+
+        release_blob(blob.pk)
+        release_blob(blob.pk)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        self.assertEqual(self.tombstones(), set())
+
+        # The last reference deletes the blob and queues its object
+        release_blob(blob.pk)
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertEqual(self.tombstones(), {self.key("event_files/1/a.pdf")})
+
+    def test_register_blob_same_content(self):
+        blob, _ = register_blob("a" * 64, "event_files/1/a.pdf", 10)
+        # A concurrent upload of the same content references the first blob
+        shared, created = register_blob("a" * 64, "event_files/2/a.pdf", 10)
+        self.assertFalse(created)
+        self.assertEqual(shared.pk, blob.pk)
+        self.assertEqual(shared.ref_count, 2)
+
+    def test_register_blob_released_meanwhile(self):
+        register_blob("a" * 64, "event_files/1/a.pdf", 10)
+
+        def released(sha256):
+            # The existing blob loses its last reference before ours is taken
+            StoredBlob.objects.filter(sha256=sha256).delete()
+
+        with mock.patch("eventi.blobs.acquire_blob", side_effect=released):
+            blob, created = register_blob("a" * 64, "event_files/2/a.pdf", 10)
+        self.assertTrue(created)
+        self.assertEqual(blob.name, "event_files/2/a.pdf")
+        self.assertEqual(blob.ref_count, 1)
+
+    def test_event_delete_queues_files(self):
+        blob, _ = register_blob("a" * 64, "event_files/condiviso.pdf", 10)
+        acquire_blob(pk=blob.pk)
+        other = Event.objects.create(
+            titolo="Altro", data_inizio=datetime.date(2025, 1, 1), created_by=self.user
+        )
+        for event in (self.event, other):
+            EventFile.objects.create(
+                event=event, file=blob.name, blob=blob, created_by=self.user
+            )
+        EventFile.objects.create(
+            event=self.event, file="event_files/1/proprio.pdf", created_by=self.user
+        )
+
+        self.client.force_login(self.user)
+        url = reverse("event_delete", kwargs={"pk": self.event.pk})
+        response = self.client.post(url)
+        self.assertRedirects(
+            response, reverse("event_list"), fetch_redirect_response=False
+        )
+        # The shared blob keeps the other event's reference
+        self.assertEqual(self.tombstones(), {self.key("event_files/1/proprio.pdf")})
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+        other.delete()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertEqual(
+            self.tombstones(),
+            {self.key("event_files/1/proprio.pdf"), self.key(blob.name)},
+        )
+
+    def test_flush_tombstones(self):
+        names = [
+            "event_files/1/orfano.pdf",
+            "event_files/1/riusato.pdf",
+            "event_files/1/errore.pdf",
+        ]
+        StorageTombstone.objects.bulk_create(
+            [StorageTombstone(key=self.key(name)) for name in names]
+        )
+        # Uploaded again under the same name after the deletion was queued
+        EventFile.objects.create(event=self.event, file=names[1], created_by=self.user)
+        self.stubber.add_response(
+            "delete_objects",
+            {"Errors": [{"Key": self.key(names[2]), "Code": "InternalError"}]},
+            {
+                "Bucket": self.bucket,
+                "Delete": {
+                    "Objects": [
+                        {"Key": self.key(names[0])},
+                        {"Key": self.key(names[2])},
+                    ],
+                    "Quiet": True,
+                },
+            },
+        )
+
+        self.assertEqual(flush_tombstones(), (1, 1))
+        self.stubber.assert_no_pending_responses()
+        # Only the failed key stays queued, for a later attempt
+        tombstone = StorageTombstone.objects.get()
+        self.assertEqual(tombstone.key, self.key(names[2]))
+        self.assertEqual(tombstone.attempts, 1)
+        self.assertEqual(tombstone.last_error, "InternalError")
+
+    def test_reconcile_bucket(self):
+        old = timezone.now() - datetime.timedelta(days=2)
+        prefix = f"{self.storage.location}/"
+        EventFile.objects.create(
+            event=self.event, file="event_files/1/usato.pdf", created_by=self.user
+        )
+        stale = self.key("event_files/1/vecchio.pdf")
+        fresh = self.key("event_files/1/nuovo.pdf")
+        self.stubber.add_response(
+            "list_multipart_uploads",
+            {
+                "Uploads": [
+                    {"Key": stale, "UploadId": "1", "Initiated": old},
+                    {"Key": fresh, "UploadId": "2", "Initiated": timezone.now()},
+                ]
+            },
+            {"Bucket": self.bucket, "Prefix": prefix},
+        )
+        self.stubber.add_response(
+            "abort_multipart_upload",
+            {},
+            {"Bucket": self.bucket, "Key": stale, "UploadId": "1"},
+        )
+        objects = [
+            ("event_files/1/usato.pdf", old),
+            ("event_files/1/orfano.pdf", old),
+            ("event_files/1/recente.pdf", timezone.now()),
+        ]
+        self.stubber.add_response(
+            "list_objects_v2",
+            {
+                "Contents": [
+                    {"Key": self.key(name), "LastModified": modified, "Size": 1}
+                    for name, modified in objects
+                ]
+            },
+            {"Bucket": self.bucket, "Prefix": prefix},
+        )
+
+        self.assertEqual(reconcile_bucket(datetime.timedelta(days=1)), (1, 1))
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(
+            list(StorageTombstone.objects.values_list("key", flat=True)),
+            [self.key("event_files/1/orfano.pdf")],
+        )
+
+
+@without_silk
+class PublicEventsApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.events = [
+            Event.objects.create(
+                categoria=Event.CATEGORIA_CHOICES[0][0],
+                office="Belgrado",
+                titolo=f"Evento {i}",
+                data_inizio=datetime.date(2025, 1, 1),
+                paese="Italia",
+                citta="Roma",
+                tipologia="Fiera",
+            )
+            for i in range(2)
+        ]
+
+    def test_deletion_invalidates_conditional_requests(self):
+        url = reverse("public_events_api_v2")
+        response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        # The oldest event goes: the latest updated_at stays the same
+        self.events[0].delete()
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            url, headers={"if-modified-since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+@without_silk
+class ImportCsvTests(TestCase):
+    columns = ["categoria", "titolo", "data_inizio", "citta", "tipologia", "descrizione"]
+
+    def import_rows(self, *rows, upsert=False):
+        """Import rows of (titolo, citta, descrizione); returns the summary line"""
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", encoding="utf-8", newline="", delete=False
+        ) as file:
+            self.addCleanup(os.remove, file.name)
+            writer = csv.writer(file)
+            writer.writerow(self.columns)
+            for titolo, citta, descrizione in rows:
+                writer.writerow(
+                    [
+                        Event.CATEGORIA_CHOICES[0][0],
+                        titolo,
+                        "2025-01-01",
+                        citta,
+                        "Fiera",
+                        descrizione,
+                    ]
+                )
+        out = io.StringIO()
+        options = ["--upsert"] if upsert else []
+        call_command("import_csv", file.name, *options, stdout=out)
+        return out.getvalue().splitlines()[-1]
+
+    def test_invalid_rows_are_reported_one_by_one(self):
+        summary = self.import_rows(
+            ("Evento", "Roma", "Valido"),
+            ("T" * 300, "Roma", "Titolo troppo lungo"),
+            ("Altro evento", "Milano", "Valido"),
+        )
+        self.assertIn("2 events created", summary)
+        self.assertIn("1 failed", summary)
+
+    def test_upsert_repeated_stored_event(self):
+        Event.objects.create(
+            categoria=Event.CATEGORIA_CHOICES[0][0],
+            titolo="Evento",
+            data_inizio=datetime.date(2025, 1, 1),
+            citta="Roma",
+            tipologia="Fiera",
+            descrizione="Originale",
+        )
+        summary = self.import_rows(
+            ("Evento", "Roma", "Prima"), ("Evento", "Roma", "Seconda"), upsert=True
+        )
+        self.assertIn("1 updated, 1 duplicates skipped", summary)
+        self.assertEqual(Event.objects.get().descrizione, "Prima")
+
+    def test_upsert_repeated_new_event(self):
+        summary = self.import_rows(
+            ("Evento", "Roma", "Prima"), ("Evento", "Roma", "Seconda"), upsert=True
+        )
+        self.assertIn("1 events created, 0 updated, 1 duplicates skipped", summary)
+        self.assertEqual(Event.objects.get().descrizione, "Prima")
@@ -0,0 +1,459 @@
+# eventi/uploads.py
+"""
+Uploads of event files to the bucket.
+
+Direct browser uploads: the browser asks for a presigned upload, sends the
+bytes straight to B2 and then confirms: the server checks the object with
+HEAD and only then creates the EventFile row, so upload bandwidth never
+goes through Django. Files up to EVENT_FILE_MULTIPART_THRESHOLD use a
+single presigned PUT, bigger ones a multipart upload with one presigned URL
+per part. The bucket CORS rules must allow PUT from the site, allow the
+x-amz-checksum-sha256 header and expose ETag.
+
+A single PUT whose SHA-256 the browser computed carries it as a signed
+x-amz-checksum-sha256 header, so the bucket rejects any other bytes; once
+the stored checksum matches, the object becomes a blob like the uploads
+that go through Django.
+
+Uploads that do go through Django are streamed into the bucket by
+S3MultipartUploadHandler while the request body is read.
+"""
+import base64
+import hashlib
+import logging
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.core import signing
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+
+from .blobs import acquire_blob, register_blob, release_blob
+from .models import EventFile
+from .storage import BackblazeB2Storage
+from .storage_gc import enqueue_deletion
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_SALT = "eventi.uploads.direct"
+# S3 limits for multipart uploads
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def event_file_storage():
+    return EventFile._meta.get_field("file").storage
+
+
+def can_stream_uploads():
+    return isinstance(event_file_storage(), BackblazeB2Storage)
+
+
+def can_upload_directly():
+    return can_stream_uploads() and event_file_storage().querystring_auth
+
+
+def start_upload(event, filename, size, content_type, sha256=""):
+    """
+    Reserve a name under event_files/<event id>/ and presign its upload.
+    Returns the data the browser needs; `token` must be sent back to
+    complete_upload(). The bytes are always uploaded, even if `sha256` is
+    already stored: a hash proves nothing about having the file, so it is
+    only checked, and shared, once the bucket has verified the upload.
+    Raises ValueError for a size or hash that can't be accepted.
+    """
+    if size <= 0 or size > settings.EVENT_FILE_MAX_UPLOAD_SIZE:
+        raise ValueError("Dimensione del file non valida.")
+    sha256 = sha256.lower()
+    if sha256 and not SHA256_RE.match(sha256):
+        raise ValueError("Impronta SHA-256 non valida.")
+
+    field = EventFile._meta.get_field("file")
+    storage = field.storage
+    name = storage.get_available_name(
+        field.generate_filename(EventFile(event=event), filename),
+        max_length=field.max_length,
+    )
+    client = storage.connection.meta.client
+    params = {"Bucket": storage.bucket_name, "Key": storage.object_key(name)}
+    expire = settings.EVENT_FILE_UPLOAD_EXPIRE
+    content_type = content_type or "application/octet-stream"
+
+    data = {"name": name}
+    upload_id = None
+    if size <= settings.EVENT_FILE_MULTIPART_THRESHOLD:
+        data["url"] = client.generate_presigned_url(
+            "put_object",
+            Params={**params, "ContentType": content_type},
+            ExpiresIn=expire,
+        )
+        data["headers"] = {"Content-Type": content_type}
+        if sha256:
+            # Signed, so the bucket verifies the bytes against the hash
+            checksum = checksum_sha256(sha256)
+            params["ChecksumSHA256"] = checksum
+            data["headers"]["x-amz-checksum-sha256"] = checksum
+    else:
+        part_size = max(
+            settings.EVENT_FILE_PART_SIZE, MIN_PART_SIZE, math.ceil(size / MAX_PARTS)
+        )
+        upload_id = client.create_multipart_upload(
+            **params, ContentType=content_type
+        )["UploadId"]
+        data["part_size"] = part_size
+        data["parts"] = [
+            client.generate_presigned_url(
+                "upload_part",
+                Params={**params, "UploadId": upload_id, "PartNumber": number},
+                ExpiresIn=expire,
+            )
+            for number in range(1, math.ceil(size / part_size) + 1)
+        ]
+
+    # Only a single PUT carries the checksum, a multipart upload can't be
+    # verified against the hash of the whole file
+    data["token"] = signing.dumps(
+        {"e": event.pk, "n": name, "u": upload_id, "s": "" if upload_id else sha256},
+        salt=UPLOAD_SALT,
+    )
+    return data
+
+
+def checksum_sha256(sha256):
+    """S3 ChecksumSHA256 value (base64 of the digest) of a hex SHA-256"""
+    return base64.b64encode(bytes.fromhex(sha256)).decode()
+
+
+def complete_upload(event, token, parts=None):
+    """
+    Finish an upload started by start_upload() and verify the object.
+    `parts` lists {"PartNumber", "ETag"} for multipart uploads.
+    Returns (name, blob, metadata): blob is the referenced StoredBlob when
+    the bucket verified the upload's hash, metadata the EventFile metadata
+    fields.
+    Raises ValueError if the upload isn't valid.
+    """
+    try:
+        data = signing.loads(
+            token, salt=UPLOAD_SALT, max_age=settings.EVENT_FILE_UPLOAD_EXPIRE
+        )
+    except signing.BadSignature:
+        raise ValueError("Caricamento scaduto o non valido.")
+    if data["e"] != event.pk:
+        raise ValueError("Caricamento non valido per questo evento.")
+
+    storage = event_file_storage()
+    client = storage.connection.meta.client
+    params = {"Bucket": storage.bucket_name, "Key": storage.object_key(data["n"])}
+
+    try:
+        if data["u"]:
+            client.complete_multipart_upload(
+                **params,
+                UploadId=data["u"],
+                MultipartUpload={
+                    "Parts": [
+                        {"PartNumber": int(part["PartNumber"]), "ETag": part["ETag"]}
+                        for part in parts or []
+                    ]
+                },
+            )
+        if data.get("s"):
+            head = client.head_object(**params, ChecksumMode="ENABLED")
+        else:
+            head = client.head_object(**params)
+    except (ClientError, KeyError, TypeError, ValueError):
+        if data["u"]:
+            abort_upload(client, params, data["u"])
+        raise ValueError("Il file non è stato caricato correttamente.")
+
+    if head["ContentLength"] > settings.EVENT_FILE_MAX_UPLOAD_SIZE:
+        client.delete_object(**params)
+        raise ValueError("Il file supera la dimensione massima consentita.")
+    content_type = head.get("ContentType", "")
+    sha256 = data.get("s")
+    if sha256 and head.get("ChecksumSHA256") == checksum_sha256(sha256):
+        # The bucket verified the bytes against the hash: share them as a blob
+        blob, created = register_blob(
+            sha256, data["n"], head["ContentLength"], head.get("ETag", "")
+        )
+        if not created:
+            enqueue_deletion(data["n"])
+        return blob.name, blob, {**blob_metadata(blob), "content_type": content_type}
+
+    # No hash the bucket verified, so the upload can't become a blob
+    return (
+        data["n"],
+        None,
+        {
+            "size": head["ContentLength"],
+            "content_type": content_type,
+            "etag": head.get("ETag", ""),
+            "checksum": "",
+        },
+    )
+
+
+def store_upload(event, file):
+    """
+    Save a file uploaded through Django under event_files/<event id>/,
+    reusing the blob of identical content instead of storing it again.
+    Returns (name, blob, metadata) like complete_upload(); the caller owns
+    the blob reference.
+    """
+    sha256 = hashlib.sha256()
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    sha256 = sha256.hexdigest()
+
+    blob = acquire_blob(sha256)
+    if blob is None:
+        field = EventFile._meta.get_field("file")
+        file.seek(0)
+        name = field.storage.save(
+            field.generate_filename(EventFile(event=event), file.name),
+            file,
+            max_length=field.max_length,
+        )
+        blob, created = register_blob(sha256, name, file.size)
+        if not created:
+            # Same content stored meanwhile: keep only the shared copy
+            enqueue_deletion(name)
+    metadata = {**blob_metadata(blob), "content_type": file.content_type or ""}
+    return blob.name, blob, metadata
+
+
+def save_event_file(event, file, user, title, description=""):
+    """
+    Create the EventFile of a file uploaded through Django: one already
+    streamed by S3MultipartUploadHandler, or any other, stored as a blob.
+    """
+    if isinstance(file, StoredUploadedFile):
+        # The handler releases the reference if no EventFile takes it
+        name, blob, metadata = file.stored_name, file.blob, file.metadata()
+    else:
+        name, blob, metadata = store_upload(event, file)
+
+    try:
+        event_file = EventFile.objects.create(
+            event=event,
+            file=name,
+            blob=blob,
+            **metadata,
+            title=title,
+            description=description,
+            created_by=user,
+        )
+    except Exception:
+        if not isinstance(file, StoredUploadedFile):
+            release_blob(blob.pk)
+        raise
+    if isinstance(file, StoredUploadedFile):
+        file.saved = True
+    return event_file
+
+
+def blob_metadata(blob):
+    """EventFile metadata fields of a file stored as `blob`"""
+    return {"size": blob.size, "etag": blob.etag, "checksum": blob.sha256}
+
+
+def abort_upload(client, params, upload_id):
+    try:
+        client.abort_multipart_upload(**params, UploadId=upload_id)
+    except ClientError:
+        pass
+
+
+class StoredUploadedFile(UploadedFile):
+    """
+    An upload already saved to the storage, under `stored_name`, as `blob`
+    (on which it holds a reference)
+    """
+
+    def __init__(self, stored_name, blob=None, **kwargs):
+        super().__init__(**kwargs)
+        self.stored_name = stored_name
+        self.blob = blob
+        # Set once an EventFile holds the blob reference
+        self.saved = False
+
+    def metadata(self):
+        """EventFile metadata fields of the upload"""
+        return {**blob_metadata(self.blob), "content_type": self.content_type or ""}
+
+    def close(self):
+        # There is no local file to close
+        pass
+
+
+class S3MultipartUploadHandler(FileUploadHandler):
+    """
+    Upload handler that streams the "file" field of an EventFile form into
+    the bucket as the request body is read, so the form gets a file that is
+    already stored: no temp file and no second upload by the storage.
+
+    Parts of MIN_PART_SIZE are sent while the next ones arrive, with at most
+    EVENT_FILE_UPLOAD_CONCURRENCY parts in flight, which also bounds the
+    memory used. A file smaller than one part is sent with a single PUT,
+    or not at all when a blob with the same SHA-256 is already stored.
+    """
+
+    field_name = "file"
+
+    def __init__(self, request, event):
+        super().__init__(request)
+        self.event = event
+        self.field = EventFile._meta.get_field("file")
+        self.storage = self.field.storage
+        self.active = False
+        self.uploaded_file = None
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.active = field_name == self.field_name
+        if not self.active:
+            return
+
+        try:
+            self.stored_name = self.storage.get_available_name(
+                self.field.generate_filename(EventFile(event=self.event), file_name),
+                max_length=self.field.max_length,
+            )
+        except (BotoCoreError, ClientError):
+            # Let the default handlers take the file
+            logger.exception("Can't stream the upload of %s", file_name)
+            self.active = False
+            return
+        self.client = self.storage.connection.meta.client
+        self.params = {
+            "Bucket": self.storage.bucket_name,
+            "Key": self.storage.object_key(self.stored_name),
+        }
+        self.buffer = bytearray()
+        self.sha256 = hashlib.sha256()
+        self.upload_id = None
+        self.futures = []
+        self.executor = None
+        self.failed = False
+        # The other handlers must not buffer this file too
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if self.failed:
+            return None
+
+        self.buffer += raw_data
+        self.sha256.update(raw_data)
+        try:
+            while len(self.buffer) >= MIN_PART_SIZE:
+                self.send_part(bytes(self.buffer[:MIN_PART_SIZE]))
+                del self.buffer[:MIN_PART_SIZE]
+        except (BotoCoreError, ClientError):
+            logger.exception("Streaming upload of %s failed", self.stored_name)
+            self.fail()
+        return None
+
+    def send_part(self, data):
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                **self.params, ContentType=self.content_type or "application/octet-stream"
+            )["UploadId"]
+            concurrency = settings.EVENT_FILE_UPLOAD_CONCURRENCY
+            self.executor = ThreadPoolExecutor(max_workers=concurrency)
+            self.slots = threading.BoundedSemaphore(concurrency)
+
+        # Wait for a free slot, so only `concurrency` parts are kept in memory
+        self.slots.acquire()
+        future = self.executor.submit(self.upload_part, len(self.futures) + 1, data)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+
+    def upload_part(self, number, data):
+        response = self.client.upload_part(
+            **self.params, UploadId=self.upload_id, PartNumber=number, Body=data
+        )
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+        if self.failed:
+            return None
+
+        sha256 = self.sha256.hexdigest()
+        blob = None
+        try:
+            if self.upload_id is None:
+                # The whole file is still in memory: known content isn't sent
+                blob = acquire_blob(sha256)
+                if blob is None:
+                    response = self.client.put_object(
+                        **self.params,
+                        Body=bytes(self.buffer),
+                        ContentType=self.content_type or "application/octet-stream",
+                    )
+            else:
+                if self.buffer:
+                    self.send_part(bytes(self.buffer))
+                response = self.client.complete_multipart_upload(
+                    **self.params,
+                    UploadId=self.upload_id,
+                    MultipartUpload={"Parts": [f.result() for f in self.futures]},
+                )
+        except (BotoCoreError, ClientError):
+            logger.exception("Streaming upload of %s failed", self.stored_name)
+            self.fail()
+            return None
+        finally:
+            self.buffer = bytearray()
+            if self.executor:
+                self.executor.shutdown()
+
+        if blob is None:
+            blob, created = register_blob(
+                sha256, self.stored_name, file_size, response.get("ETag", "")
+            )
+            if not created:
+                # Same content stored meanwhile: keep only the shared copy
+                enqueue_deletion(self.stored_name)
+
+        self.uploaded_file = StoredUploadedFile(
+            blob.name,
+            blob=blob,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+        return self.uploaded_file
+
+    def release_unsaved(self):
+        """
+        Drop the blob reference taken for the upload if no EventFile got it,
+        e.g. when the CSRF check or the form failed after the body was read.
+        """
+        if self.uploaded_file and not self.uploaded_file.saved:
+            self.uploaded_file.saved = True
+            release_blob(self.uploaded_file.blob.pk)
+
+    def fail(self):
+        self.failed = True
+        self.buffer = bytearray()
+        if self.upload_id:
+            if self.executor:
+                self.executor.shutdown(cancel_futures=True)
+            abort_upload(self.client, self.params, self.upload_id)
+
+    def upload_interrupted(self):
+        if self.active and not self.failed:
+            self.fail()
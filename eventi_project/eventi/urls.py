@@ -6,6 +6,7 @@ urlpatterns = [
     # Read-only views
     path("", views.EventListView.as_view(), name="event_list"),
     path("evento/<int:pk>/", views.EventDetailView.as_view(), name="event_detail"),
+    path("eventi/esporta/", views.EventExportView.as_view(), name="event_export"),
     # User protected views
     path("evento/crea/", views.EventCreateView.as_view(), name="event_create"),
     path(
@@ -31,9 +32,19 @@ urlpatterns = [
         views.EventFileUploadView.as_view(),
         name="event_file_upload",
     ),
+    path(
+        "events/<int:pk>/direct-upload/",
+        views.EventFileDirectUploadView.as_view(),
+        name="event_file_direct_upload",
+    ),
     # Report URLs
     path("report/", views.ReportSelectionView.as_view(), name="report_selection"),
     path("report/genera/", views.GenerateReportView.as_view(), name="generate_report"),
+    path(
+        "report/jobs/<uuid:pk>/",
+        views.ReportJobStatusView.as_view(),
+        name="report_job_status",
+    ),
     #path("check-storage/", views.check_storage, name="check_storage"),
     path("reports/files/", views.ReportFileListView.as_view(), name="report_files"),
     path(
@@ -47,4 +58,9 @@ urlpatterns = [
         name="report_file_delete",
     ),
     path("api/events/public/", views.public_events_api, name="public_events_api"),
+    path(
+        "api/v2/events/public/",
+        views.public_events_api_v2,
+        name="public_events_api_v2",
+    ),
 ]
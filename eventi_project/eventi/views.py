@@ -1,9 +1,6 @@
 # eventi/views.py
 
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 
 from django.shortcuts import render, redirect
 from django.urls import reverse_lazy
@@ -19,8 +16,7 @@ from django.views.generic import (
     DeleteView,
     TemplateView,
 )
-from django.db.models import Q
-from django.db.models import Case, When, Value, IntegerField
+from django.db.models import Max, Count, Prefetch, Q
 
 from django.utils.translation import gettext_lazy as _
 
@@ -31,14 +27,22 @@ from django.http import FileResponse, Http404
 
 from django.shortcuts import get_object_or_404
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django import forms
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import content_disposition_header, urlencode
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
 # import settings
 from django.conf import settings
 
 import datetime
-import boto3
+import hashlib
 
 
 from .models import Event
@@ -46,21 +50,56 @@ from django.core.serializers import serialize
 import json
 
 import os
-import tempfile
-from docxtpl import DocxTemplate
 
 from django.views import View
 from django.core.files.storage import default_storage
 from storages.backends.s3boto3 import S3Boto3Storage
 
-from botocore.client import Config
-
-
-from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.utils.decorators import method_decorator
 
-from .models import EventFile
+from .models import EventFile, ReportJob, Settore
+from .blobs import release_blob
+from .cache import get_or_compute, get_version
+from .downloads import presigned_url, ranged_file_response, s3_object_response
+from .jobs import submit_report_job
+from .exports import EXPORT_FORMATS, iter_export
+from .filters import filter_events
 from .forms import EventForm
+from .pagination import KeysetPaginator
+from .report_cache import cached_report
+from .selection import (
+    dump_selection,
+    load_selection,
+    selectable_events,
+    selection_filters,
+    selection_years,
+)
+from .storage import (
+    BackblazeB2Storage,
+    get_s3_client,
+    invalidate_report_files,
+    list_report_files,
+)
+from .uploads import (
+    S3MultipartUploadHandler,
+    can_stream_uploads,
+    can_upload_directly,
+    complete_upload,
+    save_event_file,
+    start_upload,
+)
+from .reports import (
+    DOCX_CONTENT_TYPE,
+    EXCEL_CONTENT_TYPE,
+    generate_docx,
+    generate_excel,
+)
+
+
+def settore_choices():
+    """(id, nome) of every settore, for the filter dropdowns"""
+    return list(Settore.objects.order_by("nome").values_list("id", "nome"))
 
 
 # Public views (read-only)
@@ -72,109 +111,101 @@ class EventListView(ListView):
     context_object_name = "events"
     paginate_by = 10
 
-    def get_queryset(self):
-        # Start with a queryset that includes related models to avoid N+1 queries
-        queryset = Event.objects.all().select_related("settore")
-
-        # Handle search and filters
-        q = self.request.GET.get("q")
-        categoria = self.request.GET.get("categoria")
-        office = self.request.GET.get("office")
-        paese = self.request.GET.get("paese")
-        settore = self.request.GET.get("settore")
-
-        # Build query conditions incrementally instead of chaining filters
-        conditions = Q()
-        if q:
-            conditions &= Q(titolo__icontains=q)
-        if categoria:
-            conditions &= Q(categoria=categoria)
-        if office:
-            conditions &= Q(office=office)
-        if paese:
-            conditions &= Q(paese=paese)
-        if settore:
-            conditions &= Q(settore_id=settore)
-
-        # Apply all filters at once
-        if conditions:
-            queryset = queryset.filter(conditions)
-
-        # Handle sorting
-        sort_field = self.request.GET.get("sort", "data_inizio")
-        sort_direction = self.request.GET.get("direction", "desc")
-
-        # Validate sort field to prevent SQL injection
-        allowed_fields = [
-            "titolo",
-            "data_inizio",
-            "citta",
-            "settore",
-            "tipologia",
-            "office",
-        ]
-        if sort_field not in allowed_fields:
-            sort_field = "data_inizio"
-
-        # Special handling for settore field (now a foreign key)
-        if sort_field == "settore":
-            # Use joined field instead of lookup
-            if sort_direction == "asc":
-                queryset = queryset.order_by("settore__nome")
-            else:
-                queryset = queryset.order_by("-settore__nome")
-        # Special handling for office field (Belgrado first)
-        elif sort_field == "office":
-            # Use Case/When but with a single annotation
-            queryset = queryset.annotate(
-                office_order=Case(
-                    When(office="Belgrado", then=Value(0)),
-                    default=Value(1),
-                    output_field=IntegerField(),
-                )
-            )
-            if sort_direction == "asc":
-                queryset = queryset.order_by("office_order", "office")
-            else:
-                queryset = queryset.order_by("-office_order", "-office")
+    # Query parameters that change the page, the only ones allowed in the
+    # page cache key
+    PAGE_CACHE_PARAMS = (
+        "q",
+        "categoria",
+        "office",
+        "paese",
+        "settore",
+        "sort",
+        "direction",
+        "page",
+        "cursor",
+    )
+
+    def get(self, request, *args, **kwargs):
+        key = self.page_cache_key()
+        if key is None:
+            return super().get(request, *args, **kwargs)
+
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
         else:
-            # Apply sorting direction for other fields
-            if sort_direction == "asc":
-                order_by = sort_field
-            else:
-                order_by = f"-{sort_field}"
-            queryset = queryset.order_by(order_by)
+            response = super().get(request, *args, **kwargs)
+            response.render()
+            if response.status_code == 200:
+                cache.set(
+                    key,
+                    (response.content, response["Content-Type"]),
+                    settings.EVENT_LIST_CACHE_TIMEOUT,
+                )
+
+        patch_cache_control(
+            response, public=True, max_age=settings.EVENT_LIST_CACHE_MAX_AGE
+        )
+        patch_vary_headers(response, ["Cookie"])
+        return response
+
+    def page_cache_key(self):
+        """
+        Cache key of the rendered page, or None if the page can't be cached:
+        only anonymous requests without pending messages or unknown
+        parameters are. The key embeds the events and settore versions, so
+        any write to them invalidates every cached page.
+        """
+        request = self.request
+        if (
+            not settings.EVENT_LIST_CACHE_TIMEOUT
+            or request.user.is_authenticated
+            or len(messages.get_messages(request))
+            or any(name not in self.PAGE_CACHE_PARAMS for name in request.GET)
+        ):
+            return None
+
+        # The query string as sent: an empty value ("sort=" drops the
+        # relevance order of a search) and repeated values change the page
+        params = urlencode(list(request.GET.lists()), doseq=True)
+        digest = hashlib.md5(params.encode()).hexdigest()
+        return (
+            f"eventi:event_list:{get_version('events')}:"
+            f"{get_version('settore')}:{digest}"
+        )
 
-        return queryset
+    def get_queryset(self):
+        # Filters and ordering are shared with the bulk export
+        return filter_events(self.request.GET).select_related("settore")
+
+    def paginate_queryset(self, queryset, page_size):
+        """Use cursor pagination when EVENT_LIST_PAGINATION is 'keyset'"""
+        if settings.EVENT_LIST_PAGINATION != "keyset":
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.get_page(self.request.GET.get("cursor"))
+        return (paginator, page, page.object_list, page.has_other_pages())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Cache frequently accessed data
-        from django.core.cache import cache
-
-        # Try to get categories from cache first
-        categoria_choices = cache.get("categoria_choices")
-        if not categoria_choices:
-            categoria_choices = Event.CATEGORIA_CHOICES
-            # Cache for 1 hour (3600 seconds)
-            cache.set("categoria_choices", categoria_choices, 3600)
-        context["categoria_choices"] = categoria_choices
+        if settings.EVENT_LIST_PAGINATION == "keyset":
+            context["keyset_pagination"] = True
+            if settings.EVENT_LIST_APPROXIMATE_COUNT:
+                context["approximate_count"] = context["paginator"].approximate_count()
 
-        # Same for other static choices
+        # Static choices
+        context["categoria_choices"] = Event.CATEGORIA_CHOICES
         context["office_choices"] = Event.OFFICE_CHOICES
         context["paese_choices"] = Event.COUNTRY_CHOICES
 
-        # For settore choices, use a cached query
-        settore_choices = cache.get("settore_choices")
-        if not settore_choices:
-            from .models import Settore
-
-            settore_choices = [
-                (s.id, s.nome) for s in Settore.objects.all().order_by("nome")
-            ]
-            cache.set("settore_choices", settore_choices, 3600)
-        context["settore_choices"] = settore_choices
+        # Settore choices come from the shared cache, invalidated on every
+        # Settore write
+        context["settore_choices"] = get_or_compute(
+            "settore", "choices", settore_choices
+        )
 
         # Add current filter values for re-selecting in dropdowns
         context["current_categoria"] = self.request.GET.get("categoria", "")
@@ -182,20 +213,63 @@ class EventListView(ListView):
         context["current_paese"] = self.request.GET.get("paese", "")
         context["current_settore"] = self.request.GET.get("settore", "")
 
+        # Current filters and ordering, for the export links
+        params = self.request.GET.copy()
+        params.pop("page", None)
+        params.pop("cursor", None)
+        context["export_query"] = params.urlencode()
+
         return context
 
 
+class EventExportView(LoginRequiredMixin, View):
+    """
+    Stream every event matching the event list filters that the user may
+    see, as CSV (?format=csv) or gzip-compressed JSON Lines (?format=jsonl).
+    """
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            messages.error(request, "Formato non supportato.")
+            return redirect("event_list")
+
+        content_type, extension = EXPORT_FORMATS[export_format]
+        events = filter_events(request.GET)
+        if not request.user.is_staff:
+            # Private events only for their creator, as on the detail page
+            events = events.filter(Q(public=True) | Q(created_by=request.user))
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        response = StreamingHttpResponse(
+            iter_export(events, export_format), content_type=content_type
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, f"eventi_{timestamp}.{extension}"
+        )
+        return response
+
+
 class EventDetailView(DetailView):
     model = Event
     template_name = "eventi/event_detail.html"
     context_object_name = "event"
 
+    def get_queryset(self):
+        # Fetch everything the template shows: settore, files and their uploaders
+        return Event.objects.select_related("settore").prefetch_related(
+            Prefetch("files", queryset=EventFile.objects.select_related("created_by"))
+        )
+
     def get_object(self, queryset=None):
         obj = super().get_object(queryset)
         # Allow view if: event is public, user is creator, or user is staff
         if obj.public or (
             self.request.user.is_authenticated
-            and (obj.created_by == self.request.user or self.request.user.is_staff)
+            and (
+                obj.created_by_id == self.request.user.id
+                or self.request.user.is_staff
+            )
         ):
             return obj
         # Otherwise redirect to the events list
@@ -222,12 +296,8 @@ class EventCreateView(LoginRequiredMixin, CreateView):
         # Handle the single file upload
         if "file" in self.request.FILES:
             file = self.request.FILES["file"]
-            EventFile.objects.create(
-                event=self.object,
-                file=file,
-                title=file.name,  # Use filename as default title
-                created_by=self.request.user,
-            )
+            # Use filename as default title
+            save_event_file(self.object, file, self.request.user, title=file.name)
 
         messages.success(self.request, "Evento creato con successo.")
         return response
@@ -252,12 +322,8 @@ class EventUpdateView(LoginRequiredMixin, UpdateView):
         # Handle the single file upload
         if "file" in self.request.FILES:
             file = self.request.FILES["file"]
-            EventFile.objects.create(
-                event=self.object,
-                file=file,
-                title=file.name,  # Use filename as default title
-                created_by=self.request.user,
-            )
+            # Use filename as default title
+            save_event_file(self.object, file, self.request.user, title=file.name)
 
         messages.success(self.request, "Evento aggiornato con successo.")
         return response
@@ -267,6 +333,8 @@ class EventUpdateView(LoginRequiredMixin, UpdateView):
         # Add existing files to the context
         if self.object:
             context["event_files"] = EventFile.objects.filter(event=self.object)
+        # The new file is uploaded straight to the bucket, as on the file form
+        context["hash_limit"] = settings.EVENT_FILE_MULTIPART_THRESHOLD
         return context
 
 
@@ -275,9 +343,32 @@ def get_upload_path(instance, filename):
     return f"event_files/{instance.event.id}/{filename}"
 
 
+@method_decorator(csrf_exempt, name="dispatch")
 class EventFileUploadView(LoginRequiredMixin, FormView):
     template_name = "eventi/eventfile_form.html"
 
+    def dispatch(self, request, *args, **kwargs):
+        # Stream the file into the bucket while the body is read. The handler
+        # must be installed before anything reads request.POST, so the CSRF
+        # check runs after this instead of in the middleware.
+        handler = None
+        if request.method == "POST" and can_stream_uploads():
+            event = Event.objects.filter(pk=kwargs["pk"]).first()
+            if event and (
+                request.user.is_staff
+                or request.user.is_authenticated
+                and event.created_by_id == request.user.id
+            ):
+                handler = S3MultipartUploadHandler(request, event)
+                request.upload_handlers.insert(0, handler)
+        try:
+            return csrf_protect(super().dispatch)(request, *args, **kwargs)
+        finally:
+            # The blob was referenced while the body was read; release it if
+            # the request ended without an EventFile taking it
+            if handler:
+                handler.release_unsaved()
+
     def get_form_class(self):
         # Create a dynamic form class
         class FileUploadForm(forms.Form):
@@ -319,13 +410,7 @@ class EventFileUploadView(LoginRequiredMixin, FormView):
             )
             description = form.cleaned_data.get("description", "")
 
-            EventFile.objects.create(
-                event=event,
-                file=file,
-                title=title,
-                description=description,
-                created_by=self.request.user,
-            )
+            save_event_file(event, file, self.request.user, title, description)
 
             messages.success(self.request, _("File aggiunto con successo."))
         except Exception as e:
@@ -342,9 +427,77 @@ class EventFileUploadView(LoginRequiredMixin, FormView):
         context = super().get_context_data(**kwargs)
         event_id = self.kwargs.get("pk")
         context["event"] = get_object_or_404(Event, pk=event_id)
+        # Files up to this size are hashed by the browser before uploading
+        context["hash_limit"] = settings.EVENT_FILE_MULTIPART_THRESHOLD
         return context
 
 
+class EventFileDirectUploadView(LoginRequiredMixin, View):
+    """
+    Direct upload of an event file to the bucket, in two POSTs:
+    action "start" returns the presigned upload, action "confirm" checks
+    the uploaded object and creates the EventFile.
+    """
+
+    def post(self, request, pk):
+        event = get_object_or_404(Event, pk=pk)
+
+        # Same rule as EventFileUploadView
+        if not request.user.is_staff and event.created_by_id != request.user.id:
+            return JsonResponse(
+                {"error": _("Non hai i permessi per aggiungere file a questo evento.")},
+                status=403,
+            )
+        if not can_upload_directly():
+            # The browser falls back to the regular upload form
+            return JsonResponse({"error": "direct upload unavailable"}, status=400)
+
+        try:
+            if request.POST.get("action") == "start":
+                return JsonResponse(
+                    start_upload(
+                        event,
+                        request.POST.get("filename", ""),
+                        int(request.POST.get("size", 0)),
+                        request.POST.get("content_type", ""),
+                        request.POST.get("sha256", ""),
+                    )
+                )
+            return self.confirm(event)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+    def confirm(self, event):
+        parts = self.request.POST.get("parts")
+        name, blob, metadata = complete_upload(
+            event,
+            self.request.POST.get("token", ""),
+            json.loads(parts) if parts else None,
+        )
+
+        try:
+            EventFile.objects.create(
+                event=event,
+                file=name,
+                blob=blob,
+                **metadata,
+                title=(
+                    self.request.POST.get("title")
+                    or os.path.splitext(os.path.basename(name))[0]
+                ),
+                description=self.request.POST.get("description", ""),
+                created_by=self.request.user,
+            )
+        except Exception:
+            if blob:
+                release_blob(blob.pk)
+            raise
+        messages.success(self.request, _("File aggiunto con successo."))
+        return JsonResponse(
+            {"redirect_url": reverse("event_detail", kwargs={"pk": event.pk})}
+        )
+
+
 class EventFileDeleteView(LoginRequiredMixin, DeleteView):
     model = EventFile
     template_name = "eventi/eventfile_confirm_delete.html"
@@ -371,17 +524,8 @@ class EventFileDeleteView(LoginRequiredMixin, DeleteView):
             messages.error(request, "Non hai i permessi per eliminare questo file.")
             return redirect("event_detail", pk=event.pk)
 
-        # Delete the physical file from storage first
-        try:
-            if self.object.file and default_storage.exists(self.object.file.name):
-                default_storage.delete(self.object.file.name)
-        except Exception as e:
-            # Log the error, but don't stop the deletion process
-            messages.warning(
-                request, f"Errore durante l'eliminazione del file dal storage: {str(e)}"
-            )
-
-        # Perform the database record deletion and add a success message
+        # Delete the record and add a success message; the stored object is
+        # queued for the storage GC by the post_delete signal
         response = super().delete(request, *args, **kwargs)
         messages.success(request, "File eliminato con successo.")
 
@@ -461,64 +605,195 @@ def public_events_api(request):
     return JsonResponse({"events": formatted_events}, safe=True)
 
 
+PUBLIC_API_FIELDS = (
+    "id",
+    "categoria",
+    "office",
+    "titolo",
+    "data_inizio",
+    "data_fine",
+    "paese",
+    "citta",
+    "settore",
+    "tipologia",
+    "descrizione",
+    "created_at",
+    "updated_at",
+)
+PUBLIC_API_DEFAULT_LIMIT = 500
+PUBLIC_API_MAX_LIMIT = 1000
+
+
+def public_events_state(request):
+    """
+    Return (max updated_at, count) of the public events, computed once per
+    request with a single aggregate query. Used for the ETag.
+    """
+    if not hasattr(request, "_public_events_state"):
+        state = Event.objects.filter(public=True).aggregate(
+            last_updated=Max("updated_at"), total=Count("id")
+        )
+        request._public_events_state = (state["last_updated"], state["total"])
+    return request._public_events_state
+
+
+def public_events_etag(request):
+    last_updated, total = public_events_state(request)
+    # The count catches deletions, the query string the requested slice
+    key = f"{last_updated.isoformat() if last_updated else ''}:{total}:{request.GET.urlencode()}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+# No Last-Modified: the latest updated_at doesn't change when an event is
+# deleted or made private, so If-Modified-Since alone would answer 304
+@cache_control(public=True, max_age=60)
+@condition(etag_func=public_events_etag)
+def public_events_api_v2(request):
+    """
+    Streaming API endpoint for public events.
+    Events are ordered by last update, so clients can sync incrementally:
+    - ?since=<ISO datetime> only returns events updated after that moment
+    - ?limit=<n> page size (default 500, max 1000)
+    - ?cursor=<next_cursor> continues from the previous page
+    Unchanged polls are answered with 304 through the ETag.
+    """
+    queryset = (
+        Event.objects.filter(public=True)
+        .order_by("updated_at", "id")
+        .values(*PUBLIC_API_FIELDS)
+    )
+
+    since = request.GET.get("since")
+    if since:
+        since_datetime = parse_datetime(since)
+        if since_datetime is None:
+            return JsonResponse({"error": "Parametro 'since' non valido."}, status=400)
+        if timezone.is_naive(since_datetime):
+            since_datetime = timezone.make_aware(since_datetime, datetime.timezone.utc)
+        queryset = queryset.filter(updated_at__gt=since_datetime)
+
+    try:
+        limit = int(request.GET.get("limit", PUBLIC_API_DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({"error": "Parametro 'limit' non valido."}, status=400)
+    limit = max(1, min(limit, PUBLIC_API_MAX_LIMIT))
+
+    paginator = KeysetPaginator(queryset, limit)
+    cursor = request.GET.get("cursor")
+    if cursor:
+        direction, values = paginator.decode_cursor(cursor)
+        if direction != "n":
+            return JsonResponse({"error": "Parametro 'cursor' non valido."}, status=400)
+        queryset = paginator.after(values)
+
+    def stream():
+        # Fetch one extra row to know whether there is another page
+        rows = queryset[: limit + 1].iterator(chunk_size=limit + 1)
+        last_row = None
+        yield '{"events": ['
+        for index, row in enumerate(rows):
+            if index == limit:
+                next_cursor = paginator.encode_cursor(last_row, "n")
+                break
+            yield ("," if index else "") + json.dumps(row, cls=DjangoJSONEncoder)
+            last_row = row
+        else:
+            next_cursor = None
+        yield f"], \"next_cursor\": {json.dumps(next_cursor)}}}"
+
+    return StreamingHttpResponse(stream(), content_type="application/json")
+
+
 class EventFileDownloadView(LoginRequiredMixin, View):
+    """
+    Download an event file. By default the browser is redirected to a
+    short-lived presigned URL, so the bytes never pass through Django.
+    Otherwise the file is streamed with Range support: bucket objects
+    with a ranged GET, so only the requested bytes are fetched, other
+    storages by seeking in the opened file.
+    """
+
     def get(self, request, event_pk, file_pk):
-        event_file = get_object_or_404(EventFile, pk=file_pk, event__pk=event_pk)
+        event_file = get_object_or_404(
+            EventFile.objects.select_related("event"), pk=file_pk, event__pk=event_pk
+        )
+
+        # Same rule as the event detail page
+        event = event_file.event
+        if not (
+            event.public or event.created_by_id == request.user.id or request.user.is_staff
+        ):
+            raise Http404("Il file richiesto non è disponibile.")
+
+        storage = event_file.file.storage
+        name = event_file.file.name
+        filename = os.path.basename(name)
 
         try:
-            response = FileResponse(event_file.file.open("rb"))
-            filename = event_file.file.name.split("/")[-1]
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            return response
+            if settings.EVENT_FILE_DOWNLOAD_MODE == "redirect":
+                url = presigned_url(
+                    storage, name, filename, settings.EVENT_FILE_URL_EXPIRE
+                )
+                if url:
+                    return redirect(url)
+            if isinstance(storage, BackblazeB2Storage):
+                # The bucket answers the Range itself: opening the file would
+                # download the whole object first
+                return s3_object_response(
+                    request,
+                    storage.connection.meta.client,
+                    storage.bucket_name,
+                    storage.object_key(name),
+                    filename,
+                    event_file.content_type or None,
+                )
+            size = event_file.size
+            if size is None:
+                size = storage.size(name)
+            return ranged_file_response(
+                request,
+                storage.open(name, "rb"),
+                size,
+                filename,
+                event_file.content_type or None,
+            )
         except Exception:
             raise Http404("Il file richiesto non è disponibile.")
 
 
 class ReportSelectionView(LoginRequiredMixin, TemplateView):
     template_name = "eventi/report_selection.html"
+    paginate_by = 50
+
+    def get_queryset(self):
+        # Events the user may report on, with the filters of the page
+        return selectable_events(
+            self.request.user, **selection_filters(self.request.GET)
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Get events filtered by user permissions
-        if self.request.user.is_staff:
-            events = Event.objects.all()
-        else:
-            events = Event.objects.filter(public=True) | Event.objects.filter(
-                created_by=self.request.user
-            )
-
-        # Apply filters if provided
-        categoria = self.request.GET.get("categoria")
-        if categoria:
-            events = events.filter(categoria=categoria)
-
-        paese = self.request.GET.get("paese")
-        if paese:
-            events = events.filter(paese=paese)
-
-        year = self.request.GET.get("year")
-        if year:
-            events = events.filter(data_inizio__year=year)
-
-        # Sort events by date
-        events = events.order_by("data_inizio")
-
-        # Get unique filter options for dropdowns
-        context["events"] = events
-
+        events = self.get_queryset()
+        filters = selection_filters(self.request.GET)
+
+        # Cursor pages: the selection can't grow with the number of events
+        paginator = KeysetPaginator(events, self.paginate_by)
+        page = paginator.get_page(self.request.GET.get("cursor"))
+        context["events"] = page
+        context["page_obj"] = page
+        if page.has_other_pages():
+            # "Select all matching" posts the signed filters, not the ids
+            context["total_events"] = events.count()
+            context["selection_token"] = dump_selection(self.request.user, filters)
+
+        # Filter options for the dropdowns
+        context["categorias"] = Event.CATEGORIA_CHOICES
         context["paesi"] = Event.COUNTRY_CHOICES
-
-        # Get unique years from events
-        years = events.dates("data_inizio", "year")
-        context["years"] = [date.year for date in years]
+        context["years"] = selection_years()
 
         # Active filters
-        context["active_filters"] = {
-            "categoria": categoria,
-            "paese": paese,
-            "year": year,
-        }
+        context["active_filters"] = filters
 
         return context
 
@@ -528,16 +803,16 @@ class GenerateReportView(LoginRequiredMixin, TemplateView):
     template_name = "eventi/report_result.html"
 
     def post(self, request, *args, **kwargs):
-        # Get selected event IDs
-        event_ids = request.POST.getlist("event_ids")
         export_format = request.POST.get("export_format", "docx")
 
-        if not event_ids:
-            messages.error(request, "Seleziona almeno un evento da esportare.")
+        try:
+            events = self.get_events()
+        except ValueError as e:
+            messages.error(request, str(e))
             return redirect("report_selection")
 
-        # Get events
-        events = Event.objects.filter(id__in=event_ids).order_by("data_inizio")
+        if request.POST.get("background") == "true":
+            return self.submit_job(events.values_list("id", flat=True), export_format)
 
         if export_format == "docx":
             return self.generate_docx(events)
@@ -547,207 +822,100 @@ class GenerateReportView(LoginRequiredMixin, TemplateView):
             messages.error(request, "Formato non supportato.")
             return redirect("report_selection")
 
-    def generate_docx(self, events):
-        # Create a context for the template
-        context = {
-            "events": [
-                {
-                    "titolo": event.titolo,
-                    "categoria": event.categoria,
-                    "data_inizio": event.data_inizio.strftime("%d/%m/%Y"),
-                    "data_fine": (
-                        event.data_fine.strftime("%d/%m/%Y") if event.data_fine else ""
-                    ),
-                    "paese": event.paese,
-                    "citta": event.citta,
-                    "settore": event.settore,
-                    "tipologia": event.tipologia,
-                    "descrizione": event.descrizione,
-                    "created_by": str(event.created_by) if event.created_by else "",
-                }
-                for event in events
-            ],
-            "total_events": len(events),
-            "report_date": datetime.datetime.now().strftime("%d/%m/%Y %H:%M"),
-        }
+    def get_events(self):
+        """
+        The selected events: either every event matching a signed selection
+        token, minus the unchecked ones, or the checked event ids.
+        Raises ValueError if the selection is invalid or empty.
+        """
+        post = self.request.POST
+        try:
+            exclude = [int(pk) for pk in post.getlist("exclude_ids")]
+            event_ids = [int(pk) for pk in post.getlist("event_ids")]
+        except ValueError:
+            raise ValueError("Selezione degli eventi non valida.")
+
+        if post.get("selection"):
+            filters = load_selection(post["selection"], self.request.user)
+            events = selectable_events(self.request.user, exclude=exclude, **filters)
+            if not events.exists():
+                raise ValueError("Nessun evento corrisponde alla selezione.")
+            return events
 
-        # Path to your Word template
-        template_path = os.path.join(
-            settings.BASE_DIR, "eventi", "templates", "eventi", "report_template.docx"
-        )
+        if not event_ids:
+            raise ValueError("Seleziona almeno un evento da esportare.")
+        return Event.objects.filter(id__in=event_ids).order_by("data_inizio")
 
-        # Check if template exists
-        if not os.path.exists(template_path):
-            messages.error(self.request, "Template di report non trovato.")
+    def submit_job(self, event_ids, export_format):
+        """Queue the report and answer immediately with the job id"""
+        if export_format not in dict(ReportJob.FORMAT_CHOICES):
+            messages.error(self.request, "Formato non supportato.")
             return redirect("report_selection")
 
-        # Use a context manager to ensure file is properly closed
         try:
-            # Create a unique filename to reduce conflict chances
-            unique_filename = f"eventi_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-            output_path = os.path.join(tempfile.gettempdir(), unique_filename)
-
-            # Generate the document
-            doc = DocxTemplate(template_path)
-            doc.render(context)
-            doc.save(output_path)
-
-            # Open and read the file in binary mode
-            with open(output_path, "rb") as f:
-                file_content = f.read()
-
-            # Prepare HTTP response
-            response = HttpResponse(
-                file_content,
-                content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            job, created = submit_report_job(event_ids, export_format, self.request.user)
+        except ValueError:
+            messages.error(self.request, "Selezione degli eventi non valida.")
+            return redirect("report_selection")
+
+        status_url = reverse("report_job_status", kwargs={"pk": job.pk})
+        if "application/json" in self.request.headers.get("Accept", ""):
+            return JsonResponse(
+                {"job_id": str(job.pk), "status": job.status, "status_url": status_url},
+                status=202,
             )
-            response["Content-Disposition"] = f"attachment; filename={unique_filename}"
-
-            # Try to remove the temporary file
-            try:
-                os.unlink(output_path)
-            except Exception as cleanup_error:
-                # Log the cleanup error but don't interrupt the response
-                print(
-                    f"Warning: Could not delete temporary file {output_path}. Error: {cleanup_error}"
-                )
 
-            return response
+        if created:
+            messages.success(
+                self.request,
+                "Il report è in preparazione, comparirà qui al termine.",
+            )
+        else:
+            messages.info(self.request, "Un report identico è già in preparazione.")
+        return redirect("report_files")
+
+    def generate_docx(self, events):
+        # Create a unique filename to reduce conflict chances
+        unique_filename = (
+            f"eventi_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+        )
 
+        try:
+            buffer = cached_report(events, "docx", generate_docx)
+        except FileNotFoundError:
+            messages.error(self.request, "Template di report non trovato.")
+            return redirect("report_selection")
         except Exception as e:
             # Comprehensive error handling
             error_message = f"Errore nella generazione del report: {str(e)}"
             messages.error(self.request, error_message)
-
-            # Try to clean up any temporary file that might have been created
-            if "output_path" in locals() and os.path.exists(output_path):
-                try:
-                    os.unlink(output_path)
-                except Exception as cleanup_error:
-                    print(f"Additional cleanup error: {cleanup_error}")
-
             return redirect("report_selection")
 
-    def generate_excel(self, events):
-        """Generate Excel report with event data"""
-        # Create a new workbook and select the active worksheet
-        workbook = openpyxl.Workbook()
-        worksheet = workbook.active
-        worksheet.title = "Eventi Report"
-
-        # Define column headers based on model fields
-        headers = [
-            "ID",
-            "Titolo",
-            "Categoria",
-            "Data Inizio",
-            "Data Fine",
-            "Paese",
-            "Città",
-            "Settore",
-            "Tipologia",
-            "Descrizione",
-            "Pubblico",
-            "Creato Da",
-            "Data Creazione",
-            "Ultimo Aggiornamento",
-        ]
-
-        # Apply header formatting
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(
-            start_color="4682B4", end_color="4682B4", fill_type="solid"
+        return FileResponse(
+            buffer,
+            as_attachment=True,
+            filename=unique_filename,
+            content_type=DOCX_CONTENT_TYPE,
         )
 
-        # Write headers
-        for col_num, header in enumerate(headers, 1):
-            cell = worksheet.cell(row=1, column=col_num)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal="center")
-
-        # Write data rows
-        for row_num, event in enumerate(events, 2):
-            # Map event attributes to columns
-            row_data = [
-                event.id,
-                event.titolo,
-                event.get_categoria_display(),  # Use display value for choices
-                event.data_inizio.strftime("%d/%m/%Y"),
-                event.data_fine.strftime("%d/%m/%Y") if event.data_fine else "",
-                event.get_paese_display(),  # Use display value for choices
-                event.citta,
-                str(event.settore) if event.settore else "",
-                event.tipologia,
-                event.descrizione,
-                "Sì" if event.public else "No",
-                str(event.created_by) if event.created_by else "",
-                event.created_at.strftime("%d/%m/%Y %H:%M") if event.created_at else "",
-                event.updated_at.strftime("%d/%m/%Y %H:%M") if event.updated_at else "",
-            ]
-
-            # Write each cell in the row
-            for col_num, cell_value in enumerate(row_data, 1):
-                cell = worksheet.cell(row=row_num, column=col_num)
-                cell.value = cell_value
-
-                # For description column, set wrap text
-                if col_num == headers.index("Descrizione") + 1:
-                    cell.alignment = Alignment(wrap_text=True)
-
-        # Auto-adjust column widths
-        for col_num, header in enumerate(headers, 1):
-            # Set a minimum width for each column
-            min_width = 10
-            max_width = 40
-
-            # Find the maximum content length in the column
-            max_length = len(str(header))
-            for row_num in range(2, len(events) + 2):
-                cell_value = worksheet.cell(row=row_num, column=col_num).value
-                if cell_value:
-                    max_length = max(max_length, len(str(cell_value)))
-
-            # Calculate adjusted width, constrained between min and max
-            adjusted_width = min(max(min_width, max_length + 2), max_width)
-            worksheet.column_dimensions[
-                get_column_letter(col_num)
-            ].width = adjusted_width
-
-            # For description column, always use max width
-            if header == "Descrizione":
-                worksheet.column_dimensions[
-                    get_column_letter(col_num)
-                ].width = max_width
-
+    def generate_excel(self, events):
+        """Generate Excel report with event data"""
         # Generate timestamp for filename
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"report_{timestamp}.xlsx"
 
-        # Create a temporary file to save the workbook
-        output_path = os.path.join(tempfile.gettempdir(), filename)
-
         try:
-            # Save workbook to temporary file
-            workbook.save(output_path)
-
-            # Create options for file storage
-            option_save_to_storage = (
-                self.request.POST.get("save_to_storage", "false") == "true"
-            )
+            buffer = cached_report(events, "excel", generate_excel)
 
             # If requested to save to storage AND download
-            if option_save_to_storage:
-                # Open the file for reading in binary mode
-                with open(output_path, "rb") as f:
-                    file_content = f.read()
-
+            if self.request.POST.get("save_to_storage", "false") == "true":
                 # Save to Backblaze S3 storage
                 storage_path = f"reports/{filename}"
 
                 # Use default_storage to save the file (which uses your S3 configuration)
-                default_storage.save(storage_path, ContentFile(file_content))
+                default_storage.save(storage_path, File(buffer))
+                invalidate_report_files()
+                buffer.seek(0)
 
                 # Add success message
                 messages.success(
@@ -755,39 +923,18 @@ class GenerateReportView(LoginRequiredMixin, TemplateView):
                     f"Report salvato con successo nel cloud storage come '{storage_path}'",
                 )
 
-            # Return the file as a downloadable response
-            with open(output_path, "rb") as f:
-                file_content = f.read()
-
-            # Prepare HTTP response
-            response = HttpResponse(
-                file_content,
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            # Stream the buffer as a downloadable response, it is closed afterwards
+            return FileResponse(
+                buffer,
+                as_attachment=True,
+                filename=filename,
+                content_type=EXCEL_CONTENT_TYPE,
             )
-            response["Content-Disposition"] = f"attachment; filename={filename}"
-
-            # Try to remove the temporary file
-            try:
-                os.unlink(output_path)
-            except Exception as cleanup_error:
-                print(
-                    f"Warning: Could not delete temporary file {output_path}. Error: {cleanup_error}"
-                )
-
-            return response
 
         except Exception as e:
             # Error handling
             error_message = f"Errore nella generazione del report Excel: {str(e)}"
             messages.error(self.request, error_message)
-
-            # Clean up any temporary file that might have been created
-            if os.path.exists(output_path):
-                try:
-                    os.unlink(output_path)
-                except Exception:
-                    pass
-
             return redirect("report_selection")
 
 
@@ -817,48 +964,9 @@ class ReportFileListView(LoginRequiredMixin, ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        # List files in the reports directory
+        # The cached listing of the reports directory, paginated by ListView
         try:
-            s3 = boto3.client(
-                "s3",
-                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME,
-                config=Config(
-                    signature_version="s3v4",
-                    s3={"payload_signing_enabled": False},
-                    # Remove the checksums parameter
-                ),
-            )
-
-            response = s3.list_objects_v2(
-                Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix="reports/"
-            )
-
-            # If there are no files
-            if "Contents" not in response:
-                return []
-
-            # Create list of file information
-            files = []
-            for item in response["Contents"]:
-                # Skip the directory itself
-                if item["Key"] == "reports/":
-                    continue
-
-                file_info = {
-                    "key": item["Key"],
-                    "name": os.path.basename(item["Key"]),
-                    "size": item["Size"],
-                    "last_modified": item["LastModified"],
-                }
-                files.append(file_info)
-
-            # Sort by last modified (newest first)
-            files.sort(key=lambda x: x["last_modified"], reverse=True)
-            return files
-
+            return list_report_files()
         except Exception as e:
             # Log the error but return an empty list
             print(f"Error listing report files: {str(e)}")
@@ -872,6 +980,11 @@ class ReportFileListView(LoginRequiredMixin, ListView):
         for file in context["report_files"]:
             file["size_human"] = self.human_readable_size(file["size"])
 
+        # Recent background reports of the user, with their progress
+        context["report_jobs"] = ReportJob.objects.filter(
+            created_by=self.request.user
+        )[:10]
+
         return context
 
     def human_readable_size(self, size, decimal_places=2):
@@ -883,6 +996,30 @@ class ReportFileListView(LoginRequiredMixin, ListView):
         return f"{size:.{decimal_places}f} {unit}"
 
 
+class ReportJobStatusView(LoginRequiredMixin, View):
+    """Polling endpoint for a background report"""
+
+    def get(self, request, pk):
+        jobs = ReportJob.objects.all()
+        if not request.user.is_staff:
+            jobs = jobs.filter(created_by=request.user)
+        job = get_object_or_404(jobs, pk=pk)
+
+        data = {
+            "job_id": str(job.pk),
+            "status": job.status,
+            "progress": job.progress,
+            "error": job.error,
+            "file_key": job.file_key,
+            "download_url": None,
+        }
+        if job.status == ReportJob.STATUS_DONE:
+            data["download_url"] = (
+                f"{reverse('report_file_download')}?{urlencode({'key': job.file_key})}"
+            )
+        return JsonResponse(data)
+
+
 class ReportFileDownloadView(LoginRequiredMixin, View):
     """View to download a report file from storage"""
 
@@ -898,44 +1035,26 @@ class ReportFileDownloadView(LoginRequiredMixin, View):
             if not file_key.startswith("reports/"):
                 file_key = f"reports/{file_key}"
 
-            # Get the file from S3 storage
-            s3 = boto3.client(
-                "s3",
-                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME,
-                config=Config(
-                    signature_version="s3v4",
-                    s3={"payload_signing_enabled": False},
-                    # Remove the checksums parameter
-                ),
-            )
-
-            response = s3.get_object(
-                Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key
-            )
+            s3 = get_s3_client()
 
             # Determine content type based on file extension
             filename = os.path.basename(file_key)
-            content_type = None
-
             if filename.endswith(".xlsx"):
-                content_type = (
-                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                content_type = EXCEL_CONTENT_TYPE
             elif filename.endswith(".docx"):
-                content_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                content_type = DOCX_CONTENT_TYPE
             else:
                 content_type = "application/octet-stream"
 
-            # Create HTTP response with file content
-            http_response = HttpResponse(
-                response["Body"].read(), content_type=content_type
+            # Stream the object in chunks, honouring Range and If-None-Match
+            return s3_object_response(
+                request,
+                s3,
+                settings.AWS_STORAGE_BUCKET_NAME,
+                file_key,
+                filename,
+                content_type,
             )
-            http_response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-            return http_response
 
         except Exception as e:
             messages.error(request, f"Errore nel download del file: {str(e)}")
@@ -958,20 +1077,10 @@ class ReportFileDeleteView(LoginRequiredMixin, View):
                 file_key = f"reports/{file_key}"
 
             # Delete the file from S3 storage
-            s3 = boto3.client(
-                "s3",
-                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME,
-                config=Config(
-                    signature_version="s3v4",
-                    s3={"payload_signing_enabled": False},
-                    # Remove the checksums parameter
-                ),
-            )
+            s3 = get_s3_client()
 
             s3.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key)
+            invalidate_report_files()
 
             messages.success(
                 request, f"File '{os.path.basename(file_key)}' eliminato con successo."
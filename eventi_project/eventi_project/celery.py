@@ -0,0 +1,12 @@
+# eventi_project/celery.py
+# Only needed with REPORT_JOBS_BACKEND = "celery":
+#   celery -A eventi_project worker
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "eventi_project.settings")
+
+app = Celery("eventi_project")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
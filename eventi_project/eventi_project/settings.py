@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 import dj_database_url
 
@@ -21,7 +22,6 @@ load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-print("setting up eventi_project")
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
@@ -154,6 +154,85 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CRISPY_ALLOWED_TEMPLATE_PACKS = "tailwind"
 CRISPY_TEMPLATE_PACK = "tailwind"
 
+# Cache shared by all the workers: Redis when REDIS_URL is set, otherwise
+# a file based cache as a local stand-in
+REDIS_URL = os.environ.get("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get(
+                "CACHE_DIR", os.path.join(tempfile.gettempdir(), "eventi_cache")
+            ),
+        }
+    }
+# Seconds a worker trusts its in-process copy of the cache versions
+CACHE_L1_TIMEOUT = int(os.environ.get("CACHE_L1_TIMEOUT", "5"))
+
+# Page cache of the event list for anonymous visitors: seconds a rendered
+# page is kept server side (0 disables it) and browser/proxy max-age
+EVENT_LIST_CACHE_TIMEOUT = int(os.environ.get("EVENT_LIST_CACHE_TIMEOUT", "600"))
+EVENT_LIST_CACHE_MAX_AGE = int(os.environ.get("EVENT_LIST_CACHE_MAX_AGE", "60"))
+
+# Event list pagination: "offset" (numbered pages) or "keyset" (cursor based)
+EVENT_LIST_PAGINATION = os.environ.get("EVENT_LIST_PAGINATION", "offset")
+EVENT_LIST_APPROXIMATE_COUNT = (
+    os.environ.get("EVENT_LIST_APPROXIMATE_COUNT", "False") == "True"
+)
+
+# Background reports: "thread" (in-process pool), "db" (run by the
+# process_report_jobs command) or "celery" (needs CELERY_BROKER_URL)
+REPORT_JOBS_BACKEND = os.environ.get("REPORT_JOBS_BACKEND", "thread")
+REPORT_JOBS_WORKERS = int(os.environ.get("REPORT_JOBS_WORKERS", "2"))
+# Seconds after which an unfinished job is considered dead
+REPORT_JOBS_TIMEOUT = int(os.environ.get("REPORT_JOBS_TIMEOUT", "900"))
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "")
+# Seconds the listing of the stored reports is cached
+REPORT_FILES_CACHE_TIMEOUT = int(os.environ.get("REPORT_FILES_CACHE_TIMEOUT", "60"))
+# Word reports with more events than REPORT_DOCX_CHUNK_SIZE are rendered in
+# parts by REPORT_DOCX_WORKERS processes (0: one per CPU) and then merged
+REPORT_DOCX_CHUNK_SIZE = int(os.environ.get("REPORT_DOCX_CHUNK_SIZE", "200"))
+REPORT_DOCX_WORKERS = int(os.environ.get("REPORT_DOCX_WORKERS", "0"))
+# Generated reports cached by content: local directory and its size limit
+# in bytes (0 disables the cache); with REPORT_CACHE_REMOTE they are also
+# shared through the bucket under reports/cache/, up to its own limit
+# (enforced by manage.py storage_gc --trim-report-cache, run periodically)
+REPORT_CACHE_DIR = os.environ.get(
+    "REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "eventi_report_cache")
+)
+REPORT_CACHE_MAX_SIZE = int(os.environ.get("REPORT_CACHE_MAX_SIZE", str(512 * 1024**2)))
+REPORT_CACHE_REMOTE = os.environ.get("REPORT_CACHE_REMOTE", "False") == "True"
+REPORT_CACHE_REMOTE_MAX_SIZE = int(
+    os.environ.get("REPORT_CACHE_REMOTE_MAX_SIZE", str(5 * 1024**3))
+)
+
+# Event file downloads: "redirect" (presigned bucket URL, falls back to
+# streaming when the storage can't presign) or "proxy" (always streamed)
+EVENT_FILE_DOWNLOAD_MODE = os.environ.get("EVENT_FILE_DOWNLOAD_MODE", "redirect")
+# Lifetime in seconds of the presigned download URLs
+EVENT_FILE_URL_EXPIRE = int(os.environ.get("EVENT_FILE_URL_EXPIRE", "300"))
+# Direct browser uploads: lifetime of the presigned upload URLs, biggest
+# accepted file and size above which the upload is split in parts (bytes)
+EVENT_FILE_UPLOAD_EXPIRE = int(os.environ.get("EVENT_FILE_UPLOAD_EXPIRE", "3600"))
+EVENT_FILE_MAX_UPLOAD_SIZE = int(
+    os.environ.get("EVENT_FILE_MAX_UPLOAD_SIZE", str(2 * 1024**3))
+)
+EVENT_FILE_MULTIPART_THRESHOLD = int(
+    os.environ.get("EVENT_FILE_MULTIPART_THRESHOLD", str(64 * 1024**2))
+)
+EVENT_FILE_PART_SIZE = int(os.environ.get("EVENT_FILE_PART_SIZE", str(16 * 1024**2)))
+# Parts sent in parallel when an upload through Django is streamed to B2
+EVENT_FILE_UPLOAD_CONCURRENCY = int(
+    os.environ.get("EVENT_FILE_UPLOAD_CONCURRENCY", "2")
+)
+
 # AWS/Backblaze B2 Settings
 AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
@@ -168,6 +247,10 @@ AWS_S3_ADDRESSING_STYLE = os.environ.get("AWS_S3_ADDRESSING_STYLE", "path")
 AWS_S3_VERIFY = os.environ.get("AWS_S3_VERIFY", "True") == "True"
 AWS_S3_USE_THREADS = os.environ.get("AWS_S3_USE_THREADS", "False") == "True"
 AWS_S3_CHECKSUMS_ENABLED = os.environ.get("AWS_S3_CHECKSUMS_ENABLED", "False") == "True"
+# Shared S3 client (eventi.storage.get_s3_client): pool size and timeouts
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_S3_MAX_POOL_CONNECTIONS", "20"))
+AWS_S3_CONNECT_TIMEOUT = int(os.environ.get("AWS_S3_CONNECT_TIMEOUT", "5"))
+AWS_S3_READ_TIMEOUT = int(os.environ.get("AWS_S3_READ_TIMEOUT", "60"))
 
 STORAGES = {
     "default": {